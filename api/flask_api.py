@@ -1,14 +1,54 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, jsonify, make_response, request, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import sqlite3
 import logging
+import csv
+import gzip
 from datetime import datetime, timedelta
-import tempfile
+from functools import wraps
+import json
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-from io import BytesIO
+from io import BytesIO, StringIO
+from report_pdfs import (
+    render_financial_statement_pdf,
+    render_monthly_summary_pdf,
+    render_transaction_analytics_pdf,
+)
+from rollup import create_rollup_table, refresh_rollup, rollup_version
+
+try:
+    import redis
+except ImportError:  # Redis is optional - without it every request hits SQLite
+    redis = None
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional - sum_gaps then uses NumPy instead
+    njit = None
+
+try:
+    from flask_compress import Compress
+except ImportError:  # Flask-Compress is optional - JSON is then gzipped by gzip_response
+    Compress = None
+
+try:
+    from pyexcelerate import Workbook
+except ImportError:  # pyexcelerate is optional - XLSX reports then go through xlsxwriter
+    Workbook = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - Flask's stdlib json encoder is the fallback
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -25,25 +65,454 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson, including numpy scalars and arrays"""
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+if orjson:
+    app.json = OrjsonProvider(app)
+
+# Compress JSON and CSV bodies larger than this many bytes. PDF and XLSX
+# downloads are left alone, both formats are already deflate-compressed
+COMPRESS_MIN_SIZE = 500
+COMPRESS_MIMETYPES = ['application/json', 'text/csv']
+
+if Compress:
+    app.config.update(
+        COMPRESS_MIN_SIZE=COMPRESS_MIN_SIZE,
+        COMPRESS_ALGORITHM=['br', 'gzip'],
+        COMPRESS_MIMETYPES=COMPRESS_MIMETYPES,
+    )
+    Compress(app)
+else:
+    @app.after_request
+    def gzip_response(response):
+        """Gzip JSON and CSV responses for clients that accept it"""
+        if response.mimetype not in COMPRESS_MIMETYPES:
+            return response
+        if response.is_streamed and not response.direct_passthrough:
+            return response  # buffering a streamed body here would undo the streaming
+        
+        response.vary.add('Accept-Encoding')
+        if 'gzip' not in request.headers.get('Accept-Encoding', '') or 'Content-Encoding' in response.headers:
+            return response
+        if 'Content-Range' in response.headers:
+            return response  # a byte range of the plain body can't be re-encoded
+        
+        # CSV reports come from send_file over an in-memory buffer, so reading
+        # the passthrough body here is cheap
+        response.direct_passthrough = False
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
 # Database configuration
 DB = '../backend/momo.db'
 
+# Read-only connections kept open between requests
+POOL_SIZE = 4
+_pool = queue.Queue(maxsize=POOL_SIZE)
+
+# Cache configuration
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+CACHE_TTL = 60  # seconds
+CACHE_VERSION_KEY = 'momo:cache_version'  # bumped by the ingest pipeline to invalidate
+
+# Report query results, keyed by (sql, params) and valid for one data_version. The params
+# carry user-chosen date ranges, so the oldest entries are evicted past REPORT_CACHE_SIZE
+REPORT_CACHE_TTL = 300  # seconds
+REPORT_CACHE_SIZE = 256
+_report_cache = OrderedDict()
+_report_cache_lock = threading.Lock()  # shared by the request threads
+
+# Rows per to_json call when streaming report frames, bounding each chunk's size
+STREAM_CHUNK_ROWS = 1000
+
+cache = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=0.1, socket_timeout=0.1) if redis else None
+
+# After a Redis error requests skip the cache for CACHE_RETRY_SECONDS, so an unreachable
+# server costs one connect timeout (and one warning) per outage rather than per request
+CACHE_RETRY_SECONDS = 30
+_cache_retry_at = 0.0
+_cache_down = False
+
+def cache_failed(e):
+    """Stop using the cache for CACHE_RETRY_SECONDS, warning only when an outage starts"""
+    global _cache_retry_at, _cache_down
+    if not _cache_down:
+        logger.warning(f"Cache unavailable, serving from database for the next {CACHE_RETRY_SECONDS}s: {e}")
+        _cache_down = True
+    _cache_retry_at = time.monotonic() + CACHE_RETRY_SECONDS
+
+def cached(ttl=CACHE_TTL):
+    """Cache a JSON endpoint's response in Redis, keyed by path + query string"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            global _cache_down
+            if cache is None or time.monotonic() < _cache_retry_at:
+                return view(*args, **kwargs)
+            
+            try:
+                version = (cache.get(CACHE_VERSION_KEY) or b'0').decode()
+                key = f"momo:{version}:{request.path}?{request.query_string.decode()}"
+                hit = cache.get(key)
+            except redis.RedisError as e:
+                cache_failed(e)
+                return view(*args, **kwargs)
+            
+            if _cache_down:
+                _cache_down = False
+                logger.info("Cache reachable again")
+            
+            if hit is not None:
+                return Response(hit, mimetype='application/json')
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                try:
+                    cache.setex(key, ttl, response.get_data())
+                except redis.RedisError as e:
+                    cache_failed(e)
+            return response
+        return wrapper
+    return decorator
+
+# Date parts the dashboard groups by, computed by SQLite from `date`. ALTER TABLE
+# can only add VIRTUAL generated columns; indexing them stores the values once
+DERIVED_COLUMNS = {
+    'month': "TEXT GENERATED ALWAYS AS (strftime('%Y-%m', date)) VIRTUAL",
+    'dow': "INTEGER GENERATED ALWAYS AS (CAST(strftime('%w', date) AS INTEGER)) VIRTUAL",
+    'hour': "INTEGER GENERATED ALWAYS AS (CAST(strftime('%H', date) AS INTEGER)) VIRTUAL",
+}
+
+# Day names indexed by dow (strftime('%w') numbering)
+DAY_NAMES = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+
+def init_db():
+    """Add the derived date columns and indexes the dashboard aggregations rely on"""
+    conn = sqlite3.connect(DB)
+    try:
+        # WAL lets the pooled readers run alongside the ingest writer
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        
+        # table_info hides generated columns, table_xinfo lists them
+        columns = {row[1] for row in conn.execute('PRAGMA table_xinfo(transactions)')}
+        for name, definition in DERIVED_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f'ALTER TABLE transactions ADD COLUMN {name} {definition}')
+                logger.info(f"Added {name} column to transactions table")
+        
+        # /transactions/ walks idx_date backwards for ORDER BY date DESC LIMIT,
+        # so it needs no separate descending index or temp B-tree sort
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_date ON transactions(date)')
+        
+        # These let the type/amount aggregates run as index-only scans
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_type_amount ON transactions(type, amount)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_date_type_amount ON transactions(date, type, amount)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_month_type ON transactions(month, type)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_hour ON transactions(hour)')
+        
+        # The ingest runs ANALYZE after loading; gather the planner statistics
+        # here for databases that were loaded before it did
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            conn.execute('ANALYZE transactions')
+        
+        # Insight KPIs are materialized here; any write to transactions only
+        # bumps data_version, and anything computed at an older version
+        # (the KPIs, cached report frames) is recomputed on next use
+        conn.execute('CREATE TABLE IF NOT EXISTS dashboard_kpis (k TEXT PRIMARY KEY, v TEXT)')
+        conn.execute("INSERT OR IGNORE INTO dashboard_kpis (k, v) VALUES ('data_version', '0')")
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS kpis_version_{event.lower()}
+                AFTER {event} ON transactions
+                BEGIN
+                    UPDATE dashboard_kpis SET v = v + 1 WHERE k = 'data_version';
+                END
+            ''')
+        
+        # Rollup the analytics report reads, shared with momo_api.py
+        create_rollup_table(conn)
+        conn.commit()
+        logger.info("Dashboard columns and indexes ready")
+    except sqlite3.Error as e:
+        logger.error(f"Failed to prepare dashboard columns and indexes: {e}")
+    finally:
+        conn.close()
+
+def data_version(conn):
+    """Current value of the write counter kept by the transactions triggers"""
+    row = conn.execute("SELECT v FROM dashboard_kpis WHERE k = 'data_version'").fetchone()
+    return row[0] if row else None
+
+KPI_KEYS = ('most_active_hour', 'largest_transaction', 'most_common_type', 'success_rate', 'average_amount')
+
+def refresh_kpis():
+    """Recompute the insight KPIs into dashboard_kpis at the current data_version"""
+    conn = sqlite3.connect(DB, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    try:
+        # Hold the write lock while reading so an ingest can't slip in
+        # between computing the KPIs and recording their version
+        cursor.execute('BEGIN IMMEDIATE')
+        version = data_version(conn)
+        kpis = {}
+        
+        # Most active hour
+        cursor.execute('''
+            SELECT hour, COUNT(*) as count
+            FROM transactions 
+            WHERE date IS NOT NULL AND date != ''
+            GROUP BY hour
+            ORDER BY count DESC
+            LIMIT 1
+        ''')
+        most_active_hour = cursor.fetchone()
+        if most_active_hour:
+            kpis['most_active_hour'] = {
+                "hour": f"{int(most_active_hour['hour'] or 0):02d}",
+                "transaction_count": most_active_hour['count'] or 0
+            }
+        
+        # Largest transaction
+        cursor.execute('''
+            SELECT amount, type
+            FROM transactions 
+            WHERE amount IS NOT NULL
+            ORDER BY amount DESC
+            LIMIT 1
+        ''')
+        largest_transaction = cursor.fetchone()
+        if largest_transaction:
+            kpis['largest_transaction'] = {
+                "amount": float(largest_transaction['amount'] or 0),
+                "type": largest_transaction['type'] or "UNKNOWN"
+            }
+        
+        # Most common transaction type
+        cursor.execute('''
+            SELECT type, COUNT(*) as count
+            FROM transactions 
+            GROUP BY type
+            ORDER BY count DESC
+            LIMIT 1
+        ''')
+        most_common_type = cursor.fetchone()
+        if most_common_type:
+            kpis['most_common_type'] = {
+                "type": most_common_type['type'] or "UNKNOWN",
+                "count": most_common_type['count'] or 0
+            }
+        
+        # Success rate
+        cursor.execute('''
+            SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as successful
+            FROM transactions
+        ''')
+        success_data = cursor.fetchone()
+        if success_data and success_data['total'] > 0:
+            kpis['success_rate'] = round((success_data['successful'] / success_data['total']) * 100, 1)
+        
+        # Average amount
+        cursor.execute('SELECT COALESCE(AVG(amount), 0) FROM transactions WHERE amount IS NOT NULL AND amount > 0')
+        kpis['average_amount'] = float(cursor.fetchone()[0] or 0)
+        
+        rows = {k: json.dumps(v) for k, v in kpis.items()}
+        rows['kpi_version'] = version
+        # Only this function's keys - dashboard_kpis also holds the version counters
+        cursor.execute(f"DELETE FROM dashboard_kpis WHERE k IN ({', '.join('?' * len(KPI_KEYS))}, 'kpi_version')", KPI_KEYS)
+        cursor.executemany('INSERT INTO dashboard_kpis (k, v) VALUES (?, ?)', rows.items())
+        cursor.execute('COMMIT')
+        return rows
+    finally:
+        conn.close()
+
+def refresh_transaction_rollup():
+    """Rebuild transaction_rollup on a writable connection - request connections are read-only"""
+    conn = sqlite3.connect(DB, isolation_level=None)
+    try:
+        refresh_rollup(conn)
+    finally:
+        conn.close()
+
+# LAG() and other window functions arrived in SQLite 3.25
+HAS_WINDOW_FUNCTIONS = sqlite3.sqlite_version_info >= (3, 25, 0)
+
+def _sum_gaps_loop(seconds):
+    """Sum and count the gaps under 24 hours between ordered epoch seconds"""
+    total = 0.0
+    count = 0
+    for i in range(1, seconds.size):
+        diff = seconds[i] - seconds[i - 1]
+        if 0 < diff < 86400:
+            total += diff
+            count += 1
+    return total, count
+
+def _sum_gaps_numpy(seconds):
+    """Vectorized _sum_gaps_loop for when numba is not installed"""
+    diffs = np.diff(seconds)
+    diffs = diffs[(diffs > 0) & (diffs < 86400)]
+    return float(diffs.sum()), int(diffs.size)
+
+sum_gaps = njit(cache=True, fastmath=True)(_sum_gaps_loop) if njit else _sum_gaps_numpy
+
 def safe_divide(numerator, denominator):
     """Safe division with zero handling"""
     return numerator / denominator if denominator else 0
 
-def format_currency(amount):
-    """Format amount as currency string"""
-    if amount is None:
-        return "RWF 0"
-    return f"RWF {float(amount):,.2f}"
+def render_pdf(renderer, *args):
+    """Run a report_pdfs renderer in the worker process pool, returning a buffer for send_file"""
+    return BytesIO(_pdf_pool.submit(renderer, *args).result())
 
-def get_db_connection():
-    """Create and return a database connection"""
-    conn = sqlite3.connect(DB)
+def sheet_rows(df):
+    """DataFrame rows as lists of plain Python values, with NaN as None"""
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+def write_xlsx(sheets):
+    """Write {sheet name: DataFrame} to an in-memory XLSX workbook"""
+    buffer = BytesIO()
+    if Workbook:
+        # pyexcelerate takes plain row lists and skips pandas' per-cell writer path
+        workbook = Workbook()
+        for name, df in sheets.items():
+            workbook.new_sheet(name, data=[df.columns.tolist()] + sheet_rows(df))
+        workbook.save(buffer)
+    else:
+        import xlsxwriter
+        
+        # constant_memory flushes each row once the next one starts, so rows
+        # must be written in order - to_excel writes column by column and
+        # would lose cells, hence the explicit write_row loop
+        workbook = xlsxwriter.Workbook(buffer, {'constant_memory': True, 'strings_to_urls': False})
+        header = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        for name, df in sheets.items():
+            worksheet = workbook.add_worksheet(name)
+            worksheet.write_row(0, 0, df.columns.tolist(), header)
+            for index, row in enumerate(sheet_rows(df), start=1):
+                worksheet.write_row(index, 0, row)
+        workbook.close()
+    
+    buffer.seek(0)
+    return buffer
+
+def frames_response(fields, frames):
+    """Streamed JSON response; DataFrame members are encoded by pandas' C encoder a chunk of rows at a time"""
+    def generate():
+        separator = "{"
+        for key, value in fields.items():
+            yield f"{separator}{json.dumps(key)}:{app.json.dumps(value)}"
+            separator = ","
+        for key, df in frames.items():
+            yield f"{separator}{json.dumps(key)}:["
+            separator = ","
+            for start in range(0, len(df), STREAM_CHUNK_ROWS):
+                rows = df.iloc[start:start + STREAM_CHUNK_ROWS].to_json(orient='records', double_precision=15)
+                yield ("," if start else "") + rows[1:-1]
+            yield "]"
+        yield "{}" if separator == "{" else "}"
+    return Response(generate(), mimetype='application/json')
+
+def rows_as_dicts(cursor):
+    """Materialize a cursor's rows as plain dicts"""
+    # Plain tuples zipped with the column names beat building sqlite3.Row objects
+    cursor.row_factory = None
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def open_read_connection():
+    """Open a read-only database connection tuned for dashboard queries"""
+    conn = sqlite3.connect(f"file:{DB}?mode=ro", uri=True, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA query_only=1')
+    conn.execute('PRAGMA mmap_size=268435456')  # 256MB memory-mapped reads
+    conn.execute('PRAGMA cache_size=-65536')    # 64MB page cache
+    conn.execute('PRAGMA temp_store=MEMORY')    # GROUP BY / DISTINCT temp B-trees stay in RAM
     return conn
 
+def get_db_connection():
+    """Take a read-only connection from the pool, opening one if none are idle"""
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        return open_read_connection()
+
+def release_db_connection(conn):
+    """Return a connection to the pool, closing it if the pool is full"""
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+def _read_pooled(sql, params):
+    """pd.read_sql_query on a connection borrowed from the pool"""
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        release_db_connection(conn)
+
+def read_sql_concurrently(conn, queries, params):
+    """Run independent report queries at once - the first on conn, the rest on pooled connections"""
+    version = data_version(conn)
+    now = time.monotonic()
+    
+    frames = {}
+    with _report_cache_lock:
+        for sql in queries:
+            hit = _report_cache.get((sql, params))
+            if hit and hit[0] == version and hit[1] > now:
+                frames[sql] = hit[2]
+    
+    missing = [sql for sql in queries if sql not in frames]
+    if missing:
+        # sqlite3 releases the GIL while stepping a query, so the scans overlap
+        futures = [_report_executor.submit(_read_pooled, sql, params) for sql in missing[1:]]
+        frames[missing[0]] = pd.read_sql_query(missing[0], conn, params=params)
+        for sql, future in zip(missing[1:], futures):
+            frames[sql] = future.result()
+        
+        with _report_cache_lock:
+            for key in [key for key, (_, expires, _) in _report_cache.items() if expires <= now]:
+                del _report_cache[key]
+            for sql in missing:
+                _report_cache[(sql, params)] = (version, now + REPORT_CACHE_TTL, frames[sql])
+                _report_cache.move_to_end((sql, params))
+            while len(_report_cache) > REPORT_CACHE_SIZE:
+                _report_cache.popitem(last=False)
+    
+    # Callers add columns to the frames, so never hand out the cached objects
+    return [frames[sql].copy() for sql in queries]
+
+# Prepare derived columns and indexes on startup, then warm the pool and start the
+# executors. Spawned PDF workers re-import this file as __mp_main__ and only need report_pdfs
+if __name__ != '__mp_main__':
+    init_db()
+    for _ in range(POOL_SIZE):
+        _pool.put_nowait(open_read_connection())
+    _report_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix='report-query')
+    
+    # PDF rendering is CPU-bound matplotlib work, so it runs in worker processes
+    # instead of contending for the GIL with the request threads.
+    # spawn keeps the workers from inheriting the pool's threads and connections
+    _pdf_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn'))
+
 @app.route("/")
 def root():
     return jsonify({
@@ -60,6 +529,7 @@ def root():
     })
 
 @app.route("/statistics/")
+@cached()
 def get_statistics():
     """Get overall transaction statistics for dashboard"""
     conn = get_db_connection()
@@ -78,71 +548,59 @@ def get_statistics():
             "types_summary": []
         }
 
-        # Total transactions
-        cursor.execute('SELECT COUNT(*) FROM transactions')
-        stats['total_transactions'] = cursor.fetchone()[0] or 0
-        
-        # Total amounts by income/expense
+        # Scalar totals and per-type breakdown in a single pass; the scalars
+        # repeat on every type row so only the first row is read for them
         cursor.execute('''
-            SELECT 
-                COALESCE(SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as total_income,
-                COALESCE(SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as total_expenses,
-                COALESCE(SUM(amount), 0) as total_volume
-            FROM transactions
-            WHERE amount IS NOT NULL
+            WITH totals AS (
+                SELECT 
+                    COUNT(*) as total_transactions,
+                    COALESCE(SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as total_income,
+                    COALESCE(SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as total_expenses,
+                    COALESCE(SUM(amount), 0) as total_volume,
+                    COALESCE(julianday(MAX(CASE WHEN date != '' THEN date END)) - COALESCE(julianday(MIN(CASE WHEN date != '' THEN date END)), 0), 0) as date_range_days
+                FROM transactions
+            ),
+            types AS (
+                SELECT 
+                    type, 
+                    COUNT(*) as count, 
+                    COALESCE(SUM(amount), 0.0) as total_amount
+                FROM transactions
+                WHERE amount IS NOT NULL
+                GROUP BY type
+            )
+            SELECT totals.*, types.type, types.count, types.total_amount
+            FROM totals LEFT JOIN types
+            ORDER BY types.count DESC
         ''')
-        amounts_data = cursor.fetchone()
-        stats['total_income'] = amounts_data['total_income']
-        stats['total_expenses'] = amounts_data['total_expenses']
-        stats['total_volume'] = amounts_data['total_volume']
+        rows = cursor.fetchall()
+        totals = rows[0]
+        stats['total_transactions'] = totals['total_transactions'] or 0
+        stats['total_income'] = totals['total_income']
+        stats['total_expenses'] = totals['total_expenses']
+        stats['total_volume'] = totals['total_volume']
         stats['balance'] = stats['total_income'] - stats['total_expenses']
+        stats['date_range_days'] = int(totals['date_range_days'])
+        stats['types_summary'] = [
+            {
+                "type": row['type'],
+                "count": row['count'],
+                "total_amount": row['total_amount']
+            } for row in rows if row['count'] is not None
+        ]
         
         # Get monthly summary for daily average calculation
         cursor.execute('''
             SELECT 
-                strftime('%Y-%m', date) as month,
+                month,
                 COUNT(*) as transaction_count,
-                COALESCE(SUM(amount), 0) as total_amount
+                COALESCE(SUM(amount), 0.0) as total_amount
             FROM transactions 
             WHERE date IS NOT NULL AND date != ''
-            GROUP BY strftime('%Y-%m', date)
+            GROUP BY month
             ORDER BY month
         ''')
-        stats['monthly_summary'] = [
-            {
-                "month": row['month'],
-                "transaction_count": row['transaction_count'],
-                "total_amount": float(row['total_amount'])
-            } for row in cursor.fetchall()
-        ]
-        
-        # Calculate date range in days
-        cursor.execute('''
-            SELECT 
-                COALESCE(julianday(MAX(date)) - COALESCE(julianday(MIN(date)), 0), 0) as date_range_days
-            FROM transactions 
-            WHERE date IS NOT NULL AND date != ''
-        ''')
-        stats['date_range_days'] = int(cursor.fetchone()['date_range_days'])
-        
-        # Get transaction types summary
-        cursor.execute('''
-            SELECT 
-                type, 
-                COUNT(*) as count, 
-                COALESCE(SUM(amount), 0) as total_amount
-            FROM transactions
-            WHERE amount IS NOT NULL
-            GROUP BY type
-            ORDER BY count DESC
-        ''')
-        stats['types_summary'] = [
-            {
-                "type": row['type'],
-                "count": row['count'],
-                "total_amount": float(row['total_amount'])
-            } for row in cursor.fetchall()
-        ]
+        stats['monthly_summary'] = rows_as_dicts(cursor)
         
         return jsonify(stats)
     
@@ -150,13 +608,13 @@ def get_statistics():
         logger.error(f"Statistics error: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch statistics"}), 500
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.route("/analytics/insights/")
+@cached()
 def get_analytics_insights():
     """Get key analytics insights for dashboard"""
     conn = get_db_connection()
-    cursor = conn.cursor()
     
     try:
         # Initialize default values
@@ -196,66 +654,13 @@ def get_analytics_insights():
             ]
         }
 
-        # Most active hour
-        cursor.execute('''
-            SELECT strftime('%H', date) as hour, COUNT(*) as count
-            FROM transactions 
-            WHERE date IS NOT NULL AND date != ''
-            GROUP BY hour
-            ORDER BY count DESC
-            LIMIT 1
-        ''')
-        most_active_hour = cursor.fetchone()
-        if most_active_hour:
-            insights['most_active_hour'] = {
-                "hour": f"{int(most_active_hour['hour'] or 0):02d}",
-                "transaction_count": most_active_hour['count'] or 0
-            }
+        kpis = {row['k']: row['v'] for row in conn.execute('SELECT k, v FROM dashboard_kpis')}
+        if kpis.get('kpi_version') != kpis.get('data_version'):
+            kpis = refresh_kpis()
         
-        # Largest transaction
-        cursor.execute('''
-            SELECT amount, type
-            FROM transactions 
-            WHERE amount IS NOT NULL
-            ORDER BY amount DESC
-            LIMIT 1
-        ''')
-        largest_transaction = cursor.fetchone()
-        if largest_transaction:
-            insights['largest_transaction'] = {
-                "amount": float(largest_transaction['amount'] or 0),
-                "type": largest_transaction['type'] or "UNKNOWN"
-            }
-        
-        # Most common transaction type
-        cursor.execute('''
-            SELECT type, COUNT(*) as count
-            FROM transactions 
-            GROUP BY type
-            ORDER BY count DESC
-            LIMIT 1
-        ''')
-        most_common_type = cursor.fetchone()
-        if most_common_type:
-            insights['most_common_type'] = {
-                "type": most_common_type['type'] or "UNKNOWN",
-                "count": most_common_type['count'] or 0
-            }
-        
-        # Success rate
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as successful
-            FROM transactions
-        ''')
-        success_data = cursor.fetchone()
-        if success_data and success_data['total'] > 0:
-            insights['success_rate'] = round((success_data['successful'] / success_data['total']) * 100, 1)
-        
-        # Average amount
-        cursor.execute('SELECT COALESCE(AVG(amount), 0) FROM transactions WHERE amount IS NOT NULL AND amount > 0')
-        insights['average_amount'] = float(cursor.fetchone()[0] or 0)
+        for key in KPI_KEYS:
+            if key in kpis:
+                insights[key] = json.loads(kpis[key])
         
         return jsonify(insights)
     
@@ -263,9 +668,10 @@ def get_analytics_insights():
         logger.error(f"Insights error: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch insights"}), 500
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.route("/analytics/monthly/")
+@cached()
 def get_monthly_analytics():
     """Get monthly transaction trends for charts"""
     conn = get_db_connection()
@@ -273,41 +679,32 @@ def get_monthly_analytics():
     
     try:
         cursor.execute('''
-            SELECT 
-                strftime('%Y-%m', date) as month,
-                COUNT(*) as transaction_count,
-                COALESCE(SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as income,
-                COALESCE(SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as expenses,
-                COALESCE(SUM(amount), 0) as total_volume,
-                COALESCE(SUM(fee), 0) as total_fees
-            FROM transactions 
-            WHERE date IS NOT NULL AND date != ''
-            GROUP BY strftime('%Y-%m', date)
+            SELECT *, income - expenses as net_flow
+            FROM (
+                SELECT 
+                    month,
+                    COUNT(*) as transaction_count,
+                    COALESCE(SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0.0 END), 0.0) as income,
+                    COALESCE(SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0.0 END), 0.0) as expenses,
+                    COALESCE(SUM(amount), 0.0) as total_volume,
+                    COALESCE(SUM(fee), 0.0) as total_fees
+                FROM transactions 
+                WHERE date IS NOT NULL AND date != ''
+                GROUP BY month
+            )
             ORDER BY month
         ''')
         
-        monthly_data = [
-            {
-                "month": row['month'],
-                "transaction_count": row['transaction_count'],
-                "income": float(row['income']),
-                "expenses": float(row['expenses']),
-                "total_volume": float(row['total_volume']),
-                "total_fees": float(row['total_fees']),
-                "net_flow": float(row['income'] - row['expenses'])
-            }
-            for row in cursor.fetchall()
-        ]
-        
-        return jsonify({"monthly_analytics": monthly_data})
+        return jsonify({"monthly_analytics": rows_as_dicts(cursor)})
     
     except Exception as e:
         logger.error(f"Monthly analytics error: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch monthly analytics"}), 500
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.route("/analytics/day_of_week/")
+@cached()
 def get_day_of_week_analytics():
     """Get transaction counts by day of week"""
     conn = get_db_connection()
@@ -316,76 +713,61 @@ def get_day_of_week_analytics():
     try:
         cursor.execute('''
             SELECT 
-                CASE CAST(strftime('%w', date) AS INTEGER)
-                    WHEN 0 THEN 'Sunday'
-                    WHEN 1 THEN 'Monday'
-                    WHEN 2 THEN 'Tuesday'
-                    WHEN 3 THEN 'Wednesday'
-                    WHEN 4 THEN 'Thursday'
-                    WHEN 5 THEN 'Friday'
-                    WHEN 6 THEN 'Saturday'
-                END as day_of_week,
+                dow,
                 COUNT(*) as transaction_count,
-                COALESCE(SUM(amount), 0) as total_volume
+                COALESCE(SUM(amount), 0.0) as total_volume
             FROM transactions 
             WHERE date IS NOT NULL
-            GROUP BY day_of_week
+            GROUP BY dow
             ORDER BY transaction_count DESC
         ''')
         
-        days_data = [
-            {
-                "day": row['day_of_week'],
-                "transaction_count": row['transaction_count'],
-                "total_volume": float(row['total_volume'])
-            }
-            for row in cursor.fetchall()
+        # Name the seven groups here instead of evaluating a CASE for every row
+        days = [
+            {"day": DAY_NAMES[dow] if dow is not None else None, "transaction_count": count, "total_volume": volume}
+            for dow, count, volume in cursor.fetchall()
         ]
-        
-        return jsonify({"days_analytics": days_data})
+        return jsonify({"days_analytics": days})
     
     except Exception as e:
         logger.error(f"Day of week analytics error: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch day of week analytics"}), 500
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.route("/analytics/time_between/")
+@cached()
 def get_time_between_analytics():
     """Calculate average time between transactions"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Get all transaction dates ordered chronologically
-        cursor.execute('''
-            SELECT date FROM transactions 
-            WHERE date IS NOT NULL
-            ORDER BY date
-        ''')
-        
-        dates = [row['date'] for row in cursor.fetchall()]
-        
-        if len(dates) < 2:
-            return jsonify({"avg_hours_between": 0})
-        
-        # Calculate time differences
-        total_diff_seconds = 0
-        count = 0
-        
-        for i in range(1, len(dates)):
-            try:
-                current = datetime.strptime(dates[i], '%Y-%m-%d %H:%M:%S')
-                previous = datetime.strptime(dates[i-1], '%Y-%m-%d %H:%M:%S')
-                
-                diff = (current - previous).total_seconds()
-                
-                # Only count reasonable differences (less than 24 hours)
-                if 0 < diff < 86400:  # 24 hours in seconds
-                    total_diff_seconds += diff
-                    count += 1
-            except (ValueError, TypeError):
-                continue
+        if HAS_WINDOW_FUNCTIONS:
+            # Gap to the previous transaction, averaged in SQLite - only
+            # reasonable differences (less than 24 hours) are counted
+            cursor.execute('''
+                SELECT 
+                    COUNT(*) as pair_count,
+                    COALESCE(SUM(diff), 0) as total_diff_seconds
+                FROM (
+                    SELECT (julianday(date) - julianday(LAG(date) OVER (ORDER BY date))) * 86400 as diff
+                    FROM transactions 
+                    WHERE date IS NOT NULL
+                )
+                WHERE diff > 0 AND diff < 86400
+            ''')
+            
+            row = cursor.fetchone()
+            count = row['pair_count']
+            total_diff_seconds = row['total_diff_seconds']
+        else:
+            # No LAG on older SQLite - pull the ordered dates and diff them here
+            cursor.execute("SELECT date FROM transactions WHERE date IS NOT NULL AND date != '' ORDER BY date")
+            # Unparseable dates become NaT and are dropped, like the rows LAG's julianday() skips
+            dates = pd.to_datetime([row[0] for row in cursor.fetchall()], errors='coerce', format='ISO8601')
+            seconds = dates.dropna().astype('datetime64[s]').asi8
+            total_diff_seconds, count = sum_gaps(seconds)
         
         avg_hours = (total_diff_seconds / count / 3600) if count > 0 else 0
         
@@ -399,7 +781,7 @@ def get_time_between_analytics():
         logger.error(f"Time between analytics error: {e}", exc_info=True)
         return jsonify({"error": "Failed to calculate time between transactions"}), 500
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.route("/transactions/")
 def get_transactions():
@@ -414,40 +796,25 @@ def get_transactions():
             SELECT 
                 transaction_id, 
                 type, 
-                COALESCE(amount, 0) as amount, 
+                COALESCE(amount, 0.0) as amount, 
                 date, 
                 status, 
                 description, 
                 sender, 
                 receiver, 
-                COALESCE(fee, 0) as fee
+                COALESCE(fee, 0.0) as fee
             FROM transactions
             ORDER BY date DESC
             LIMIT ?
         ''', (limit,))
         
-        transactions = [
-            {
-                "transaction_id": row['transaction_id'],
-                "type": row['type'],
-                "amount": float(row['amount']),
-                "date": row['date'],
-                "status": row['status'],
-                "description": row['description'],
-                "sender": row['sender'],
-                "receiver": row['receiver'],
-                "fee": float(row['fee'])
-            }
-            for row in cursor.fetchall()
-        ]
-        
-        return jsonify(transactions)
+        return jsonify(rows_as_dicts(cursor))
     
     except Exception as e:
         logger.error(f"Recent transactions error: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch recent transactions"}), 500
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.route("/reports/monthly_summary")
 def generate_monthly_summary_report():
@@ -484,11 +851,13 @@ def _generate_monthly_summary_report(format):
     conn = get_db_connection()
     today = datetime.now()
     current_month = today.strftime('%Y-%m')
+    month_start = today.replace(day=1)
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
     month_name = today.strftime('%B %Y')
     
     try:
-        # Get monthly data with proper null handling
-        monthly_df = pd.read_sql_query(f"""
+        # Daily data with proper null handling
+        daily_query = """
             SELECT 
                 strftime('%Y-%m-%d', date) as day,
                 COUNT(*) as transaction_count,
@@ -496,27 +865,27 @@ def _generate_monthly_summary_report(format):
                 COALESCE(SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as expenses,
                 COALESCE(SUM(amount), 0) as total_volume
             FROM transactions 
-            WHERE strftime('%Y-%m', date) = '{current_month}'
+            WHERE date >= ? AND date < ?
             AND date IS NOT NULL AND date != ''
             GROUP BY day
             ORDER BY day
-        """, conn)
+        """
         
-        # Get transaction types with proper null handling
-        types_df = pd.read_sql_query(f"""
+        # Transaction types with proper null handling
+        types_query = """
             SELECT 
                 type,
                 COUNT(*) as count,
                 COALESCE(SUM(amount), 0) as total_amount,
                 COALESCE(AVG(amount), 0) as avg_amount
             FROM transactions
-            WHERE strftime('%Y-%m', date) = '{current_month}'
+            WHERE date >= ? AND date < ?
             GROUP BY type
-            ORDER BY count DESC
-        """, conn)
+            ORDER BY count DESC, type
+        """
         
-        # Get summary with proper null handling
-        summary_df = pd.read_sql_query(f"""
+        # Summary with proper null handling
+        summary_query = """
             SELECT 
                 COUNT(*) as total_transactions,
                 COALESCE(SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as total_income,
@@ -526,19 +895,58 @@ def _generate_monthly_summary_report(format):
                 COALESCE(MAX(amount), 0) as max_amount,
                 COUNT(DISTINCT strftime('%Y-%m-%d', date)) as active_days
             FROM transactions
-            WHERE strftime('%Y-%m', date) = '{current_month}'
-        """, conn)
+            WHERE date >= ? AND date < ?
+        """
         
-        # Get recent transactions
-        transactions_df = pd.read_sql_query(f"""
+        # Recent transactions
+        transactions_query = """
             SELECT 
-                date, type, COALESCE(amount, 0) as amount, 
+                date, type, COALESCE(amount, 0.0) as amount, 
                 sender, receiver, status, description
             FROM transactions
-            WHERE strftime('%Y-%m', date) = '{current_month}'
-            ORDER BY date DESC
+            WHERE date >= ? AND date < ?
+            ORDER BY date DESC, id DESC
             LIMIT 20
-        """, conn)
+        """
+        
+        # A date range instead of month = ? lets idx_date_type_amount cover the
+        # aggregates and idx_date return recent rows already in order
+        params = (month_start.strftime('%Y-%m-%d'), next_month_start.strftime('%Y-%m-%d'))
+        
+        # One index probe instead of running the report queries over an empty month
+        if not conn.execute('SELECT 1 FROM transactions WHERE date >= ? AND date < ? LIMIT 1', params).fetchone():
+            return jsonify({"error": f"No transactions found for {month_name}"}), 404
+        
+        # JSON only needs plain dicts, so skip building DataFrames for it
+        if format.lower() not in ('pdf', 'xlsx', 'excel', 'csv'):
+            return jsonify({
+                "report_title": f"Monthly Summary - {month_name}",
+                "generated_date": today.strftime('%Y-%m-%d'),
+                "summary": rows_as_dicts(conn.execute(summary_query, params))[0],
+                "daily_data": rows_as_dicts(conn.execute(daily_query, params)),
+                "transaction_types": rows_as_dicts(conn.execute(types_query, params)),
+                "recent_transactions": rows_as_dicts(conn.execute(transactions_query, params))
+            })
+        
+        # The CSV is only the recent transactions, so write them straight from the cursor
+        if format.lower() == 'csv':
+            cursor = conn.execute(transactions_query, params)
+            text = StringIO()
+            writer = csv.writer(text, lineterminator='\n')
+            writer.writerow([column[0] for column in cursor.description])
+            writer.writerows(cursor)
+            buffer = BytesIO(text.getvalue().encode('utf-8'))
+            
+            return send_file(
+                buffer,
+                download_name=f"MoMo_Monthly_Summary_{current_month}.csv",
+                as_attachment=True,
+                mimetype='text/csv'
+            )
+        
+        monthly_df, types_df, summary_df, transactions_df = read_sql_concurrently(
+            conn, [daily_query, types_query, summary_query, transactions_query], params
+        )
         
         # Calculate metrics with null checks
         summary = summary_df.iloc[0] if not summary_df.empty else {
@@ -559,136 +967,36 @@ def _generate_monthly_summary_report(format):
         
         # Generate report based on format
         if format.lower() == 'pdf':
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                with PdfPages(temp_file.name) as pdf:
-                    # Title page
-                    plt.figure(figsize=(8.5, 11))
-                    plt.axis('off')
-                    plt.text(0.5, 0.9, f"MTN MoMo Monthly Summary", ha='center', fontsize=24)
-                    plt.text(0.5, 0.85, f"{month_name}", ha='center', fontsize=18)
-                    plt.text(0.5, 0.8, f"Generated on {today.strftime('%d %B %Y')}", ha='center', fontsize=14)
-                    
-                    # Add summary statistics
-                    plt.text(0.5, 0.7, f"Total Transactions: {total_transactions:,}", ha='center', fontsize=12)
-                    plt.text(0.5, 0.65, f"Total Income: {format_currency(total_income)}", ha='center', fontsize=12)
-                    plt.text(0.5, 0.6, f"Total Expenses: {format_currency(total_expenses)}", ha='center', fontsize=12)
-                    plt.text(0.5, 0.55, f"Net Flow: {format_currency(total_income - total_expenses)}", ha='center', fontsize=12)
-                    plt.text(0.5, 0.5, f"Average Daily Transactions: {avg_daily:.1f}", ha='center', fontsize=12)
-                    
-                    pdf.savefig()
-                    plt.close()
-                    
-                    # Daily transaction chart
-                    if not monthly_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title(f"Daily Transaction Counts - {month_name}")
-                        plt.plot(monthly_df['day'], monthly_df['transaction_count'], marker='o')
-                        plt.xlabel('Date')
-                        plt.ylabel('Transaction Count')
-                        plt.xticks(rotation=45)
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                        
-                        # Income vs Expenses chart
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title(f"Daily Income vs Expenses - {month_name}")
-                        plt.plot(monthly_df['day'], monthly_df['income'], marker='o', label='Income')
-                        plt.plot(monthly_df['day'], monthly_df['expenses'], marker='s', label='Expenses')
-                        plt.xlabel('Date')
-                        plt.ylabel('Amount (RWF)')
-                        plt.legend()
-                        plt.xticks(rotation=45)
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                    
-                    # Transaction types pie chart
-                    if not types_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title(f"Transaction Types Distribution - {month_name}")
-                        plt.pie(types_df['count'], labels=types_df['type'], autopct='%1.1f%%')
-                        plt.axis('equal')
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                    
-                    # Transactions table
-                    if not transactions_df.empty:
-                        plt.figure(figsize=(8.5, 11))
-                        plt.axis('off')
-                        plt.text(0.5, 0.98, "Recent Transactions", ha='center', fontsize=16)
-                        
-                        cell_text = []
-                        for _, row in transactions_df.head(15).iterrows():
-                            date = row['date'].split(' ')[0] if ' ' in row['date'] else row['date']
-                            cell_text.append([
-                                date, 
-                                row['type'], 
-                                format_currency(row['amount']), 
-                                row['status']
-                            ])
-                        
-                        table = plt.table(
-                            cellText=cell_text,
-                            colLabels=['Date', 'Type', 'Amount', 'Status'],
-                            loc='center',
-                            cellLoc='center',
-                            colWidths=[0.15, 0.35, 0.25, 0.15]
-                        )
-                        table.auto_set_font_size(False)
-                        table.set_fontsize(8)
-                        table.scale(1, 1.5)
-                        
-                        pdf.savefig()
-                        plt.close()
-                
-                return send_file(
-                    temp_file.name,
-                    download_name=f"MoMo_Monthly_Summary_{current_month}.pdf",
-                    as_attachment=True,
-                    mimetype='application/pdf'
-                )
+            buffer = render_pdf(
+                render_monthly_summary_pdf, month_name, today.strftime('%d %B %Y'), total_transactions,
+                total_income, total_expenses, avg_daily, monthly_df, types_df, transactions_df
+            )
+            
+            return send_file(
+                buffer,
+                download_name=f"MoMo_Monthly_Summary_{current_month}.pdf",
+                as_attachment=True,
+                mimetype='application/pdf'
+            )
         
         elif format.lower() in ['xlsx', 'excel']:
-            with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as temp_file:
-                with pd.ExcelWriter(temp_file.name, engine='xlsxwriter') as writer:
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
-                    transactions_df.to_excel(writer, sheet_name='Transactions', index=False)
-                    monthly_df.to_excel(writer, sheet_name='Daily Data', index=False)
-                    types_df.to_excel(writer, sheet_name='Transaction Types', index=False)
-                
-                return send_file(
-                    temp_file.name,
-                    download_name=f"MoMo_Monthly_Summary_{current_month}.xlsx",
-                    as_attachment=True,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
-        
-        elif format.lower() == 'csv':
-            buffer = BytesIO()
-            transactions_df.to_csv(buffer, index=False)
-            buffer.seek(0)
+            buffer = write_xlsx({
+                'Summary': summary_df,
+                'Transactions': transactions_df,
+                'Daily Data': monthly_df,
+                'Transaction Types': types_df,
+            })
             
             return send_file(
                 buffer,
-                download_name=f"MoMo_Monthly_Summary_{current_month}.csv",
+                download_name=f"MoMo_Monthly_Summary_{current_month}.xlsx",
                 as_attachment=True,
-                mimetype='text/csv'
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
             )
         
-        else:  # JSON
-            return jsonify({
-                "report_title": f"Monthly Summary - {month_name}",
-                "generated_date": today.strftime('%Y-%m-%d'),
-                "summary": summary.to_dict(),
-                "daily_data": monthly_df.to_dict(orient='records'),
-                "transaction_types": types_df.to_dict(orient='records'),
-                "recent_transactions": transactions_df.to_dict(orient='records')
-            })
     
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def _generate_financial_statement(format):
     """Actual implementation of financial statement report"""
@@ -699,187 +1007,127 @@ def _generate_financial_statement(format):
     end_date = today.strftime('%Y-%m-%d')
     
     try:
+        # One index probe instead of running the report queries over an empty range
+        if not conn.execute('SELECT 1 FROM transactions WHERE date >= ? LIMIT 1', (start_date,)).fetchone():
+            return jsonify({"error": f"No transactions found from {start_date} to {end_date}"}), 404
+        
         # Get monthly data with null handling
-        monthly_df = pd.read_sql_query(f"""
+        monthly_query = """
             SELECT 
-                strftime('%Y-%m', date) as month,
+                month,
                 COALESCE(SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as income,
                 COALESCE(SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as expenses,
                 COALESCE(SUM(fee), 0) as fees
             FROM transactions 
-            WHERE date >= '{start_date}'
+            WHERE date >= ?
             GROUP BY month
             ORDER BY month
-        """, conn)
-        
-        # Calculate running balance
-        if not monthly_df.empty:
-            monthly_df['net'] = monthly_df['income'] - monthly_df['expenses']
-            monthly_df['running_balance'] = monthly_df['net'].cumsum()
+        """
         
         # Get category breakdown
-        categories_df = pd.read_sql_query(f"""
+        categories_query = """
             SELECT 
                 type as category,
                 COUNT(*) as count,
                 COALESCE(SUM(amount), 0) as total_amount,
                 COALESCE(SUM(fee), 0) as total_fees
             FROM transactions
-            WHERE date >= '{start_date}'
+            WHERE date >= ?
             GROUP BY type
             ORDER BY total_amount DESC
-        """, conn)
+        """
         
         # Get top expenses
-        top_expenses_df = pd.read_sql_query(f"""
+        top_expenses_query = """
             SELECT 
                 receiver,
                 COUNT(*) as count,
                 COALESCE(SUM(amount), 0) as total_amount
             FROM transactions
-            WHERE date >= '{start_date}'
+            WHERE date >= ?
             AND type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT')
             GROUP BY receiver
             ORDER BY total_amount DESC
             LIMIT 10
-        """, conn)
+        """
         
         # Get top income sources
-        top_income_df = pd.read_sql_query(f"""
+        top_income_query = """
             SELECT 
                 sender,
                 COUNT(*) as count,
                 COALESCE(SUM(amount), 0) as total_amount
             FROM transactions
-            WHERE date >= '{start_date}'
+            WHERE date >= ?
             AND type IN ('INCOMING_MONEY', 'BANK_DEPOSIT')
             GROUP BY sender
             ORDER BY total_amount DESC
             LIMIT 10
-        """, conn)
+        """
         
         # Get overall summary
-        summary_df = pd.read_sql_query(f"""
+        summary_query = """
             SELECT 
                 COUNT(*) as total_transactions,
                 COALESCE(SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as total_income,
                 COALESCE(SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN amount ELSE 0 END), 0) as total_expenses,
                 COALESCE(SUM(fee), 0) as total_fees
             FROM transactions
-            WHERE date >= '{start_date}'
-        """, conn)
+            WHERE date >= ?
+        """
+        
+        monthly_df, categories_df, top_expenses_df, top_income_df, summary_df = read_sql_concurrently(
+            conn, [monthly_query, categories_query, top_expenses_query, top_income_query, summary_query], (start_date,)
+        )
+        
+        # Calculate running balance
+        if not monthly_df.empty:
+            monthly_df['net'] = monthly_df['income'] - monthly_df['expenses']
+            monthly_df['running_balance'] = monthly_df['net'].cumsum()
         
         # Generate report based on format
         if format.lower() == 'pdf':
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                with PdfPages(temp_file.name) as pdf:
-                    # Title page
-                    plt.figure(figsize=(8.5, 11))
-                    plt.axis('off')
-                    plt.text(0.5, 0.9, "MTN MoMo Financial Statement", ha='center', fontsize=24)
-                    plt.text(0.5, 0.85, f"{start_date} to {end_date}", ha='center', fontsize=18)
-                    plt.text(0.5, 0.8, f"Generated on {today.strftime('%d %B %Y')}", ha='center', fontsize=14)
-                    
-                    # Add summary statistics
-                    if not summary_df.empty:
-                        summary = summary_df.iloc[0]
-                        income = summary['total_income']
-                        expenses = summary['total_expenses']
-                        fees = summary['total_fees']
-                        net = income - expenses - fees
-                        
-                        plt.text(0.5, 0.7, f"Total Income: {format_currency(income)}", ha='center', fontsize=12)
-                        plt.text(0.5, 0.65, f"Total Expenses: {format_currency(expenses)}", ha='center', fontsize=12)
-                        plt.text(0.5, 0.6, f"Total Fees: {format_currency(fees)}", ha='center', fontsize=12)
-                        plt.text(0.5, 0.55, f"Net Balance: {format_currency(net)}", ha='center', fontsize=12)
-                        plt.text(0.5, 0.5, f"Total Transactions: {summary['total_transactions']:,}", ha='center', fontsize=12)
-                    
-                    pdf.savefig()
-                    plt.close()
-                    
-                    # Monthly income vs expenses
-                    if not monthly_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Monthly Income vs Expenses")
-                        plt.bar(monthly_df['month'], monthly_df['income'], label='Income')
-                        plt.bar(monthly_df['month'], -monthly_df['expenses'], label='Expenses')
-                        plt.xlabel('Month')
-                        plt.ylabel('Amount (RWF)')
-                        plt.legend()
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                        
-                        # Running balance
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Monthly Running Balance")
-                        plt.plot(monthly_df['month'], monthly_df['running_balance'], marker='o')
-                        plt.xlabel('Month')
-                        plt.ylabel('Balance (RWF)')
-                        plt.grid(True, linestyle='--', alpha=0.7)
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                    
-                    # Category breakdown
-                    if not categories_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Transaction Categories")
-                        plt.pie(categories_df['total_amount'], labels=categories_df['category'], autopct='%1.1f%%')
-                        plt.axis('equal')
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                    
-                    # Top expenses
-                    if not top_expenses_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Top Expense Recipients")
-                        plt.barh(top_expenses_df['receiver'].head(8), top_expenses_df['total_amount'].head(8))
-                        plt.xlabel('Amount (RWF)')
-                        plt.ylabel('Recipient')
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                
-                return send_file(
-                    temp_file.name,
-                    download_name=f"MoMo_Financial_Statement_{start_date}_to_{end_date}.pdf",
-                    as_attachment=True,
-                    mimetype='application/pdf'
-                )
+            buffer = render_pdf(
+                render_financial_statement_pdf, start_date, end_date, today.strftime('%d %B %Y'),
+                summary_df, monthly_df, categories_df, top_expenses_df
+            )
+            
+            return send_file(
+                buffer,
+                download_name=f"MoMo_Financial_Statement_{start_date}_to_{end_date}.pdf",
+                as_attachment=True,
+                mimetype='application/pdf'
+            )
         
         elif format.lower() in ['xlsx', 'excel']:
-            with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as temp_file:
-                with pd.ExcelWriter(temp_file.name, engine='xlsxwriter') as writer:
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
-                    monthly_df.to_excel(writer, sheet_name='Monthly Data', index=False)
-                    categories_df.to_excel(writer, sheet_name='Categories', index=False)
-                    top_expenses_df.to_excel(writer, sheet_name='Top Expenses', index=False)
-                    top_income_df.to_excel(writer, sheet_name='Top Income', index=False)
-                
-                return send_file(
-                    temp_file.name,
-                    download_name=f"MoMo_Financial_Statement_{start_date}_to_{end_date}.xlsx",
-                    as_attachment=True,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
+            buffer = write_xlsx({
+                'Summary': summary_df,
+                'Monthly Data': monthly_df,
+                'Categories': categories_df,
+                'Top Expenses': top_expenses_df,
+                'Top Income': top_income_df,
+            })
+            
+            return send_file(
+                buffer,
+                download_name=f"MoMo_Financial_Statement_{start_date}_to_{end_date}.xlsx",
+                as_attachment=True,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
         
         elif format.lower() == 'csv':
-            result_df = pd.concat([
-                pd.DataFrame([{"report_type": "Financial Statement", 
-                               "date_range": f"{start_date} to {end_date}"}]),
-                pd.DataFrame([{"section": "Monthly Data"}]),
-                monthly_df,
-                pd.DataFrame([{"section": "Categories"}]),
-                categories_df,
-                pd.DataFrame([{"section": "Summary"}]),
-                summary_df
-            ])
+            text = StringIO()
+            writer = csv.writer(text, lineterminator='\n')
+            writer.writerow(["report_type", "date_range"])
+            writer.writerow(["Financial Statement", f"{start_date} to {end_date}"])
             
-            buffer = BytesIO()
-            result_df.to_csv(buffer, index=False)
-            buffer.seek(0)
+            # Each section gets a heading row and its own column header, rather
+            # than concatenating the frames into one sparse table
+            for section, section_df in (("Monthly Data", monthly_df), ("Categories", categories_df), ("Summary", summary_df)):
+                writer.writerow([])
+                writer.writerow(["section", section])
+                section_df.to_csv(text, index=False, lineterminator='\n')
+            buffer = BytesIO(text.getvalue().encode('utf-8'))
             
             return send_file(
                 buffer,
@@ -889,19 +1137,20 @@ def _generate_financial_statement(format):
             )
         
         else:  # JSON
-            return jsonify({
+            return frames_response({
                 "report_title": "Financial Statement",
                 "date_range": f"{start_date} to {end_date}",
                 "generated_date": today.strftime('%Y-%m-%d'),
-                "summary": summary_df.iloc[0].to_dict() if not summary_df.empty else {},
-                "monthly_data": monthly_df.to_dict(orient='records'),
-                "categories": categories_df.to_dict(orient='records'),
-                "top_expenses": top_expenses_df.to_dict(orient='records'),
-                "top_income": top_income_df.to_dict(orient='records')
+                "summary": summary_df.iloc[0].to_dict() if not summary_df.empty else {}
+            }, {
+                "monthly_data": monthly_df,
+                "categories": categories_df,
+                "top_expenses": top_expenses_df,
+                "top_income": top_income_df
             })
     
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def _generate_transaction_analytics_report(format):
     """Actual implementation of transaction analytics report"""
@@ -911,204 +1160,122 @@ def _generate_transaction_analytics_report(format):
     start_date = one_year_ago.strftime('%Y-%m-%d')
     
     try:
-        # Get monthly trends with null handling
-        monthly_df = pd.read_sql_query(f"""
-            SELECT 
-                strftime('%Y-%m', date) as month,
-                COUNT(*) as transaction_count,
-                COALESCE(SUM(amount), 0) as total_volume,
-                COALESCE(AVG(amount), 0) as avg_amount,
-                COUNT(DISTINCT strftime('%Y-%m-%d', date)) as active_days
-            FROM transactions 
-            WHERE date >= '{start_date}'
-            GROUP BY month
-            ORDER BY month
-        """, conn)
+        # One index probe instead of rebuilding the rollup and rendering empty charts
+        if not conn.execute('SELECT 1 FROM transactions WHERE date >= ? LIMIT 1', (start_date,)).fetchone():
+            return jsonify({"error": f"No transactions found since {start_date}"}), 404
         
-        # Calculate transactions per day
-        if not monthly_df.empty:
-            monthly_df['transactions_per_day'] = monthly_df['transaction_count'] / monthly_df['active_days'].replace(0, 1)
+        # Scan the window of the pre-aggregated rollup once into the CTE and
+        # group it five ways instead of running five queries over transactions;
+        # each branch is tagged with grp and split back into frames below.
+        # Columns a branch doesn't need are filled with 0
+        if rollup_version(conn) != data_version(conn):
+            refresh_transaction_rollup()
         
-        # Get hourly distribution
-        hourly_df = pd.read_sql_query(f"""
+        analytics_query = """
+            WITH window_rows AS (
+                SELECT *
+                FROM transaction_rollup
+                WHERE day >= ?
+            )
             SELECT 
-                strftime('%H', date) as hour,
-                COUNT(*) as transaction_count,
-                COALESCE(SUM(amount), 0) as total_volume,
-                COALESCE(AVG(amount), 0) as avg_amount
-            FROM transactions 
-            WHERE date >= '{start_date}'
+                'monthly' as grp,
+                month as key,
+                month as sort_key,
+                SUM(tx_count) as transaction_count,
+                COALESCE(SUM(total_volume), 0) as total_volume,
+                COALESCE(1.0 * SUM(total_volume) / SUM(amount_count), 0) as avg_amount,
+                0 as min_amount,
+                0 as max_amount,
+                0 as min_positive_amount,
+                COUNT(DISTINCT day) as active_days,
+                0 as income_count,
+                0 as expense_count,
+                1.0 * SUM(tx_count) / MAX(COUNT(DISTINCT day), 1) as transactions_per_day
+            FROM window_rows
+            GROUP BY month
+            UNION ALL
+            SELECT 
+                'hourly', printf('%02d', hour), hour,
+                SUM(tx_count), COALESCE(SUM(total_volume), 0), COALESCE(1.0 * SUM(total_volume) / SUM(amount_count), 0),
+                0, 0, 0, 0, 0, 0, 0
+            FROM window_rows
             GROUP BY hour
-            ORDER BY hour
-        """, conn)
-        
-        # Get day of week distribution
-        day_of_week_df = pd.read_sql_query(f"""
+            UNION ALL
             SELECT 
-                CASE CAST(strftime('%w', date) AS INTEGER)
-                    WHEN 0 THEN 'Sunday'
-                    WHEN 1 THEN 'Monday'
-                    WHEN 2 THEN 'Tuesday'
-                    WHEN 3 THEN 'Wednesday'
-                    WHEN 4 THEN 'Thursday'
-                    WHEN 5 THEN 'Friday'
-                    WHEN 6 THEN 'Saturday'
-                END as day_of_week,
-                COUNT(*) as transaction_count,
-                COALESCE(SUM(amount), 0) as total_volume,
-                COALESCE(AVG(amount), 0) as avg_amount
-            FROM transactions 
-            WHERE date >= '{start_date}'
-            GROUP BY day_of_week
-            ORDER BY CASE day_of_week
-                WHEN 'Monday' THEN 1
-                WHEN 'Tuesday' THEN 2
-                WHEN 'Wednesday' THEN 3
-                WHEN 'Thursday' THEN 4
-                WHEN 'Friday' THEN 5
-                WHEN 'Saturday' THEN 6
-                WHEN 'Sunday' THEN 7
-            END
-        """, conn)
-        
-        # Get frequency by type
-        type_frequency_df = pd.read_sql_query(f"""
+                'day_of_week', dow, (dow + 6) % 7,  -- Monday first, named below
+                SUM(tx_count), COALESCE(SUM(total_volume), 0), COALESCE(1.0 * SUM(total_volume) / SUM(amount_count), 0),
+                0, 0, 0, 0, 0, 0, 0
+            FROM window_rows
+            GROUP BY dow
+            UNION ALL
             SELECT 
-                type,
-                COUNT(*) as transaction_count,
-                COALESCE(SUM(amount), 0) as total_volume,
-                COALESCE(AVG(amount), 0) as avg_amount,
-                COALESCE(MIN(amount), 0) as min_amount,
-                COALESCE(MAX(amount), 0) as max_amount
-            FROM transactions 
-            WHERE date >= '{start_date}'
+                'type', type, -SUM(tx_count),
+                SUM(tx_count), COALESCE(SUM(total_volume), 0), COALESCE(1.0 * SUM(total_volume) / SUM(amount_count), 0),
+                COALESCE(MIN(min_amount), 0), COALESCE(MAX(max_amount), 0),
+                0, 0, 0, 0, 0
+            FROM window_rows
             GROUP BY type
-            ORDER BY transaction_count DESC
-        """, conn)
-        
-        # Get insights and statistics
-        insights_df = pd.read_sql_query(f"""
+            UNION ALL
             SELECT 
-                COUNT(*) as total_transactions,
-                COUNT(DISTINCT strftime('%Y-%m-%d', date)) as active_days,
-                COALESCE(SUM(amount), 0) as total_volume,
-                COALESCE(AVG(amount), 0) as avg_amount,
-                COALESCE(MAX(amount), 0) as max_amount,
-                COALESCE(MIN(CASE WHEN amount > 0 THEN amount END), 0) as min_amount,
-                SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN 1 ELSE 0 END) as income_count,
-                SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN 1 ELSE 0 END) as expense_count
-            FROM transactions
-            WHERE date >= '{start_date}'
-        """, conn)
+                'overall', NULL, NULL,
+                SUM(tx_count), COALESCE(SUM(total_volume), 0), COALESCE(1.0 * SUM(total_volume) / SUM(amount_count), 0),
+                0, COALESCE(MAX(max_amount), 0),
+                COALESCE(MIN(min_positive_amount), 0),
+                COUNT(DISTINCT day),
+                SUM(CASE WHEN type IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN tx_count ELSE 0 END),
+                SUM(CASE WHEN type NOT IN ('INCOMING_MONEY', 'BANK_DEPOSIT') THEN tx_count ELSE 0 END),
+                0
+            FROM window_rows
+            ORDER BY grp, sort_key, key
+        """
+        
+        analytics_df, = read_sql_concurrently(conn, [analytics_query], (start_date,))
+        
+        def breakdown(grp, key, columns):
+            """Rows of one grp branch, with key renamed and only the given columns"""
+            rows = analytics_df[analytics_df['grp'] == grp].rename(columns={'key': key})
+            return rows[[key] + columns].reset_index(drop=True)
+        
+        monthly_df = breakdown('monthly', 'month', ['transaction_count', 'total_volume', 'avg_amount', 'active_days', 'transactions_per_day'])
+        hourly_df = breakdown('hourly', 'hour', ['transaction_count', 'total_volume', 'avg_amount'])
+        day_of_week_df = breakdown('day_of_week', 'day_of_week', ['transaction_count', 'total_volume', 'avg_amount'])
+        day_of_week_df['day_of_week'] = day_of_week_df['day_of_week'].map(dict(enumerate(DAY_NAMES)))
+        type_frequency_df = breakdown('type', 'type', ['transaction_count', 'total_volume', 'avg_amount', 'min_amount', 'max_amount'])
+        insights_df = analytics_df[analytics_df['grp'] == 'overall'].rename(columns={
+            'transaction_count': 'total_transactions',
+            'min_positive_amount': 'min_amount',
+            'min_amount': 'all_min_amount',
+        })[['total_transactions', 'active_days', 'total_volume', 'avg_amount', 'max_amount', 'min_amount', 'income_count', 'expense_count']].reset_index(drop=True)
         
         # Format response based on requested format
         if format.lower() == 'pdf':
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                with PdfPages(temp_file.name) as pdf:
-                    # Title page
-                    plt.figure(figsize=(8.5, 11))
-                    plt.axis('off')
-                    plt.text(0.5, 0.9, "MTN MoMo Transaction Analytics", ha='center', fontsize=24)
-                    plt.text(0.5, 0.85, f"Analysis Period: {start_date} to {today.strftime('%Y-%m-%d')}", ha='center', fontsize=18)
-                    plt.text(0.5, 0.8, f"Generated on {today.strftime('%d %B %Y')}", ha='center', fontsize=14)
-                    
-                    # Add key insights
-                    if not insights_df.empty:
-                        insights = insights_df.iloc[0]
-                        success_rate = (insights['income_count'] / insights['total_transactions'] * 100) if insights['total_transactions'] else 0
-                        
-                        plt.text(0.5, 0.7, f"Total Transactions: {insights['total_transactions']:,}", ha='center', fontsize=12)
-                        plt.text(0.5, 0.65, f"Transaction Volume: {format_currency(insights['total_volume'])}", ha='center', fontsize=12)
-                        plt.text(0.5, 0.6, f"Average Transaction: {format_currency(insights['avg_amount'])}", ha='center', fontsize=12)
-                        plt.text(0.5, 0.55, f"Largest Transaction: {format_currency(insights['max_amount'])}", ha='center', fontsize=12)
-                        plt.text(0.5, 0.5, f"Active Days: {insights['active_days']} days", ha='center', fontsize=12)
-                        plt.text(0.5, 0.45, f"Income Transactions: {insights['income_count']:,} ({success_rate:.1f}%)", ha='center', fontsize=12)
-                        plt.text(0.5, 0.4, f"Expense Transactions: {insights['expense_count']:,} ({100 - success_rate:.1f}%)", ha='center', fontsize=12)
-                    
-                    pdf.savefig()
-                    plt.close()
-                    
-                    # Monthly trends
-                    if not monthly_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Monthly Transaction Trends")
-                        plt.bar(monthly_df['month'], monthly_df['transaction_count'])
-                        plt.xlabel('Month')
-                        plt.ylabel('Transaction Count')
-                        plt.xticks(rotation=45)
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                        
-                        # Monthly volume
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Monthly Transaction Volume")
-                        plt.plot(monthly_df['month'], monthly_df['total_volume'], marker='o')
-                        plt.xlabel('Month')
-                        plt.ylabel('Volume (RWF)')
-                        plt.xticks(rotation=45)
-                        plt.grid(True, linestyle='--', alpha=0.7)
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                    
-                    # Hourly distribution
-                    if not hourly_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Hourly Transaction Distribution")
-                        plt.bar(hourly_df['hour'], hourly_df['transaction_count'])
-                        plt.xlabel('Hour of Day')
-                        plt.ylabel('Transaction Count')
-                        plt.xticks(range(0, 24))
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                    
-                    # Day of week distribution
-                    if not day_of_week_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Day of Week Distribution")
-                        plt.bar(day_of_week_df['day_of_week'], day_of_week_df['transaction_count'])
-                        plt.xlabel('Day of Week')
-                        plt.ylabel('Transaction Count')
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                    
-                    # Transaction types
-                    if not type_frequency_df.empty:
-                        plt.figure(figsize=(8.5, 6))
-                        plt.title("Transaction Types Distribution")
-                        plt.pie(type_frequency_df['transaction_count'], 
-                                labels=type_frequency_df['type'], 
-                                autopct='%1.1f%%')
-                        plt.axis('equal')
-                        plt.tight_layout()
-                        pdf.savefig()
-                        plt.close()
-                
-                return send_file(
-                    temp_file.name,
-                    download_name=f"MoMo_Transaction_Analytics_{today.strftime('%Y-%m-%d')}.pdf",
-                    as_attachment=True,
-                    mimetype='application/pdf'
-                )
+            buffer = render_pdf(
+                render_transaction_analytics_pdf, start_date, today.strftime('%Y-%m-%d'), today.strftime('%d %B %Y'),
+                insights_df, monthly_df, hourly_df, day_of_week_df, type_frequency_df
+            )
+            
+            return send_file(
+                buffer,
+                download_name=f"MoMo_Transaction_Analytics_{today.strftime('%Y-%m-%d')}.pdf",
+                as_attachment=True,
+                mimetype='application/pdf'
+            )
         
         elif format.lower() in ['xlsx', 'excel']:
-            with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as temp_file:
-                with pd.ExcelWriter(temp_file.name, engine='xlsxwriter') as writer:
-                    insights_df.to_excel(writer, sheet_name='Insights', index=False)
-                    monthly_df.to_excel(writer, sheet_name='Monthly Trends', index=False)
-                    hourly_df.to_excel(writer, sheet_name='Hourly Distribution', index=False)
-                    day_of_week_df.to_excel(writer, sheet_name='Day of Week', index=False)
-                    type_frequency_df.to_excel(writer, sheet_name='Transaction Types', index=False)
-                
-                return send_file(
-                    temp_file.name,
-                    download_name=f"MoMo_Transaction_Analytics_{today.strftime('%Y-%m-%d')}.xlsx",
-                    as_attachment=True,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
+            buffer = write_xlsx({
+                'Insights': insights_df,
+                'Monthly Trends': monthly_df,
+                'Hourly Distribution': hourly_df,
+                'Day of Week': day_of_week_df,
+                'Transaction Types': type_frequency_df,
+            })
+            
+            return send_file(
+                buffer,
+                download_name=f"MoMo_Transaction_Analytics_{today.strftime('%Y-%m-%d')}.xlsx",
+                as_attachment=True,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
         
         elif format.lower() == 'csv':
             buffer = BytesIO()
@@ -1123,19 +1290,20 @@ def _generate_transaction_analytics_report(format):
             )
         
         else:  # JSON
-            return jsonify({
+            return frames_response({
                 "report_title": "Transaction Analytics",
                 "date_range": f"{start_date} to {today.strftime('%Y-%m-%d')}",
                 "generated_date": today.strftime('%Y-%m-%d'),
-                "insights": insights_df.iloc[0].to_dict() if not insights_df.empty else {},
-                "monthly_trends": monthly_df.to_dict(orient='records'),
-                "hourly_distribution": hourly_df.to_dict(orient='records'),
-                "day_of_week": day_of_week_df.to_dict(orient='records'),
-                "transaction_types": type_frequency_df.to_dict(orient='records')
+                "insights": insights_df.iloc[0].to_dict() if not insights_df.empty else {}
+            }, {
+                "monthly_trends": monthly_df,
+                "hourly_distribution": hourly_df,
+                "day_of_week": day_of_week_df,
+                "transaction_types": type_frequency_df
             })
     
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
\ No newline at end of file
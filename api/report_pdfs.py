@@ -0,0 +1,280 @@
+"""PDF rendering for the Flask report endpoints
+
+The renderers take plain values and DataFrames and return the PDF bytes.
+This module imports nothing from Flask or the database, so the API can
+run them in ProcessPoolExecutor workers.
+"""
+from functools import lru_cache
+from io import BytesIO
+import matplotlib
+matplotlib.use('Agg')  # headless rendering, no GUI backend
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
+
+@lru_cache(maxsize=4096)
+def _format_rwf(amount):
+    """Format a float as RWF, memoized since the same totals recur across pages and requests"""
+    return f"RWF {amount:,.2f}"
+
+def format_currency(amount):
+    """Format amount as currency string"""
+    if amount is None:
+        return "RWF 0"
+    return _format_rwf(float(amount))  # float() so numpy scalars share one hashable key
+
+def new_report_page(fig, figsize):
+    """Clear the shared report figure and size it for the next page"""
+    fig.clear()
+    fig.set_size_inches(figsize)
+    return fig.add_subplot()
+
+# Text artists of this process's title page, keyed by role. The page is laid
+# out once and later reports only replace the text (see title_page)
+_title_texts = {}
+
+def title_page(title, subtitle, generated_on, summary_lines):
+    """Letter-size report title page, reusing this process's laid-out Figure with new text"""
+    if not _title_texts:
+        ax = Figure(figsize=(8.5, 11)).add_subplot()
+        ax.axis('off')
+        _title_texts.update(
+            title=ax.text(0.5, 0.9, "", ha='center', fontsize=24),
+            subtitle=ax.text(0.5, 0.85, "", ha='center', fontsize=18),
+            generated_on=ax.text(0.5, 0.8, "", ha='center', fontsize=14),
+            # One artist for all summary rows, spaced as rows 0.05 apart
+            summary=ax.text(0.5, 0.73, "", ha='center', va='top', fontsize=12, linespacing=2.55),
+        )
+    
+    _title_texts['title'].set_text(title)
+    _title_texts['subtitle'].set_text(subtitle)
+    _title_texts['generated_on'].set_text(f"Generated on {generated_on}")
+    _title_texts['summary'].set_text("\n".join(summary_lines))
+    return _title_texts['title'].get_figure()
+
+def render_monthly_summary_pdf(month_name, generated_on, total_transactions, total_income, total_expenses,
+                               avg_daily, monthly_df, types_df, transactions_df):
+    """Render the monthly summary report PDF"""
+    buffer = BytesIO()
+    fig = Figure()  # one figure, cleared and reused for every page
+    with PdfPages(buffer) as pdf:
+        # Title page
+        pdf.savefig(title_page("MTN MoMo Monthly Summary", month_name, generated_on, [
+            f"Total Transactions: {total_transactions:,}",
+            f"Total Income: {format_currency(total_income)}",
+            f"Total Expenses: {format_currency(total_expenses)}",
+            f"Net Flow: {format_currency(total_income - total_expenses)}",
+            f"Average Daily Transactions: {avg_daily:.1f}",
+        ]))
+        
+        # Daily transaction chart
+        if not monthly_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title(f"Daily Transaction Counts - {month_name}")
+            ax.plot(monthly_df['day'], monthly_df['transaction_count'], marker='o')
+            ax.set_xlabel('Date')
+            ax.set_ylabel('Transaction Count')
+            ax.tick_params(axis='x', labelrotation=45)
+            fig.tight_layout()
+            pdf.savefig(fig)
+            
+            # Income vs Expenses chart
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title(f"Daily Income vs Expenses - {month_name}")
+            ax.plot(monthly_df['day'], monthly_df['income'], marker='o', label='Income')
+            ax.plot(monthly_df['day'], monthly_df['expenses'], marker='s', label='Expenses')
+            ax.set_xlabel('Date')
+            ax.set_ylabel('Amount (RWF)')
+            ax.legend()
+            ax.tick_params(axis='x', labelrotation=45)
+            fig.tight_layout()
+            pdf.savefig(fig)
+        
+        # Transaction types pie chart
+        if not types_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title(f"Transaction Types Distribution - {month_name}")
+            ax.pie(types_df['count'], labels=types_df['type'], autopct='%1.1f%%')
+            ax.axis('equal')
+            fig.tight_layout()
+            pdf.savefig(fig)
+        
+        # Transactions table
+        if not transactions_df.empty:
+            ax = new_report_page(fig, (8.5, 11))
+            ax.axis('off')
+            ax.text(0.5, 0.98, "Recent Transactions", ha='center', fontsize=16)
+            
+            recent = transactions_df.head(15)
+            cell_text = [
+                [date.split(' ')[0], type_, format_currency(amount), status]
+                for date, type_, amount, status in zip(
+                    recent['date'], recent['type'], recent['amount'], recent['status']
+                )
+            ]
+            
+            table = ax.table(
+                cellText=cell_text,
+                colLabels=['Date', 'Type', 'Amount', 'Status'],
+                loc='center',
+                cellLoc='center',
+                colWidths=[0.15, 0.35, 0.25, 0.15]
+            )
+            table.auto_set_font_size(False)
+            table.set_fontsize(8)
+            table.scale(1, 1.5)
+            
+            pdf.savefig(fig)
+    
+    return buffer.getvalue()
+
+def render_financial_statement_pdf(start_date, end_date, generated_on, summary_df, monthly_df,
+                                   categories_df, top_expenses_df):
+    """Render the financial statement report PDF"""
+    buffer = BytesIO()
+    fig = Figure()  # one figure, cleared and reused for every page
+    with PdfPages(buffer) as pdf:
+        # Title page
+        summary_lines = []
+        if not summary_df.empty:
+            summary = summary_df.iloc[0]
+            income = summary['total_income']
+            expenses = summary['total_expenses']
+            fees = summary['total_fees']
+            net = income - expenses - fees
+            
+            summary_lines = [
+                f"Total Income: {format_currency(income)}",
+                f"Total Expenses: {format_currency(expenses)}",
+                f"Total Fees: {format_currency(fees)}",
+                f"Net Balance: {format_currency(net)}",
+                f"Total Transactions: {summary['total_transactions']:,}",
+            ]
+        
+        pdf.savefig(title_page(
+            "MTN MoMo Financial Statement", f"{start_date} to {end_date}", generated_on, summary_lines
+        ))
+        
+        # Monthly income vs expenses
+        if not monthly_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Monthly Income vs Expenses")
+            ax.bar(monthly_df['month'], monthly_df['income'], label='Income')
+            ax.bar(monthly_df['month'], -monthly_df['expenses'], label='Expenses')
+            ax.set_xlabel('Month')
+            ax.set_ylabel('Amount (RWF)')
+            ax.legend()
+            fig.tight_layout()
+            pdf.savefig(fig)
+            
+            # Running balance
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Monthly Running Balance")
+            ax.plot(monthly_df['month'], monthly_df['running_balance'], marker='o')
+            ax.set_xlabel('Month')
+            ax.set_ylabel('Balance (RWF)')
+            ax.grid(True, linestyle='--', alpha=0.7)
+            fig.tight_layout()
+            pdf.savefig(fig)
+        
+        # Category breakdown
+        if not categories_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Transaction Categories")
+            ax.pie(categories_df['total_amount'], labels=categories_df['category'], autopct='%1.1f%%')
+            ax.axis('equal')
+            fig.tight_layout()
+            pdf.savefig(fig)
+        
+        # Top expenses
+        if not top_expenses_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Top Expense Recipients")
+            ax.barh(top_expenses_df['receiver'].head(8), top_expenses_df['total_amount'].head(8))
+            ax.set_xlabel('Amount (RWF)')
+            ax.set_ylabel('Recipient')
+            fig.tight_layout()
+            pdf.savefig(fig)
+    
+    return buffer.getvalue()
+
+def render_transaction_analytics_pdf(start_date, end_date, generated_on, insights_df, monthly_df,
+                                     hourly_df, day_of_week_df, type_frequency_df):
+    """Render the transaction analytics report PDF"""
+    buffer = BytesIO()
+    fig = Figure()  # one figure, cleared and reused for every page
+    with PdfPages(buffer) as pdf:
+        # Title page
+        summary_lines = []
+        if not insights_df.empty:
+            insights = insights_df.iloc[0]
+            success_rate = (insights['income_count'] / insights['total_transactions'] * 100) if insights['total_transactions'] else 0
+            
+            summary_lines = [
+                f"Total Transactions: {insights['total_transactions']:,}",
+                f"Transaction Volume: {format_currency(insights['total_volume'])}",
+                f"Average Transaction: {format_currency(insights['avg_amount'])}",
+                f"Largest Transaction: {format_currency(insights['max_amount'])}",
+                f"Active Days: {insights['active_days']} days",
+                f"Income Transactions: {insights['income_count']:,} ({success_rate:.1f}%)",
+                f"Expense Transactions: {insights['expense_count']:,} ({100 - success_rate:.1f}%)",
+            ]
+        
+        pdf.savefig(title_page(
+            "MTN MoMo Transaction Analytics", f"Analysis Period: {start_date} to {end_date}", generated_on, summary_lines
+        ))
+        
+        # Monthly trends
+        if not monthly_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Monthly Transaction Trends")
+            ax.bar(monthly_df['month'], monthly_df['transaction_count'])
+            ax.set_xlabel('Month')
+            ax.set_ylabel('Transaction Count')
+            ax.tick_params(axis='x', labelrotation=45)
+            fig.tight_layout()
+            pdf.savefig(fig)
+            
+            # Monthly volume
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Monthly Transaction Volume")
+            ax.plot(monthly_df['month'], monthly_df['total_volume'], marker='o')
+            ax.set_xlabel('Month')
+            ax.set_ylabel('Volume (RWF)')
+            ax.tick_params(axis='x', labelrotation=45)
+            ax.grid(True, linestyle='--', alpha=0.7)
+            fig.tight_layout()
+            pdf.savefig(fig)
+        
+        # Hourly distribution
+        if not hourly_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Hourly Transaction Distribution")
+            ax.bar(hourly_df['hour'], hourly_df['transaction_count'])
+            ax.set_xlabel('Hour of Day')
+            ax.set_ylabel('Transaction Count')
+            ax.set_xticks(range(0, 24))
+            fig.tight_layout()
+            pdf.savefig(fig)
+        
+        # Day of week distribution
+        if not day_of_week_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Day of Week Distribution")
+            ax.bar(day_of_week_df['day_of_week'], day_of_week_df['transaction_count'])
+            ax.set_xlabel('Day of Week')
+            ax.set_ylabel('Transaction Count')
+            fig.tight_layout()
+            pdf.savefig(fig)
+        
+        # Transaction types
+        if not type_frequency_df.empty:
+            ax = new_report_page(fig, (8.5, 6))
+            ax.set_title("Transaction Types Distribution")
+            ax.pie(type_frequency_df['transaction_count'], 
+                    labels=type_frequency_df['type'], 
+                    autopct='%1.1f%%')
+            ax.axis('equal')
+            fig.tight_layout()
+            pdf.savefig(fig)
+    
+    return buffer.getvalue()
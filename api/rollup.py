@@ -0,0 +1,68 @@
+"""transaction_rollup, the per (day, hour, type) rollup shared by both APIs
+
+flask_api.py's analytics report and momo_api.py's statistics, summary and
+analytics endpoints aggregate this table instead of scanning transactions.
+Writes to transactions bump data_version in dashboard_kpis (see the
+kpis_version_* triggers), and refresh_rollup rebuilds the table when it has
+moved past the rollup_version it was last built at.
+"""
+import sqlite3
+
+# Same definition as backend/db_schema.sql
+ROLLUP_COLUMNS = '''
+    day TEXT, month TEXT, dow INTEGER, hour INTEGER, type TEXT, dated INTEGER,
+    tx_count INTEGER, amount_count INTEGER, total_volume REAL, total_fees REAL,
+    completed_count INTEGER, positive_count INTEGER, positive_volume REAL,
+    min_amount REAL, max_amount REAL, min_positive_amount REAL,
+    first_date TEXT, last_date TEXT
+'''
+
+def create_rollup_table(conn):
+    """Create transaction_rollup, replacing the per-app rollups it was split into before"""
+    columns = [column[1] for column in conn.execute('PRAGMA table_info(transaction_rollup)')]
+    if columns and 'min_positive_amount' not in columns:
+        # Older FastAPI-only layout; the table only holds derived rows
+        conn.execute('DROP TABLE transaction_rollup')
+        conn.execute("DELETE FROM dashboard_kpis WHERE k = 'rollup_version'")
+    conn.execute('DROP TABLE IF EXISTS transaction_metrics')
+    conn.execute("DELETE FROM dashboard_kpis WHERE k = 'metrics_version'")
+    conn.execute(f'CREATE TABLE IF NOT EXISTS transaction_rollup ({ROLLUP_COLUMNS})')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_rollup_day ON transaction_rollup(day)')
+
+def rollup_version(conn):
+    """data_version transaction_rollup was last built at"""
+    row = conn.execute("SELECT v FROM dashboard_kpis WHERE k = 'rollup_version'").fetchone()
+    return row[0] if row else None
+
+def refresh_rollup(conn):
+    """Rebuild transaction_rollup if transactions changed since it was last built; conn must be a writable autocommit connection"""
+    versions = dict(conn.execute("SELECT k, v FROM dashboard_kpis WHERE k IN ('data_version', 'rollup_version')"))
+    if versions.get('rollup_version') == versions['data_version']:
+        return
+    
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = conn.execute("SELECT v FROM dashboard_kpis WHERE k = 'data_version'").fetchone()[0]
+        if rollup_version(conn) != version:  # another request may have just rebuilt it
+            conn.execute('DELETE FROM transaction_rollup')
+            # Computed from date rather than flask_api.py's generated columns,
+            # which databases set up by momo_api.py alone don't have
+            conn.execute('''
+                INSERT INTO transaction_rollup
+                SELECT
+                    DATE(date), strftime('%Y-%m', date),
+                    CAST(strftime('%w', date) AS INTEGER), CAST(strftime('%H', date) AS INTEGER),
+                    type, date IS NOT NULL AND date != '',
+                    COUNT(*), COUNT(amount), SUM(amount), SUM(fee),
+                    SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END),
+                    COUNT(CASE WHEN amount > 0 THEN 1 END), SUM(CASE WHEN amount > 0 THEN amount END),
+                    MIN(amount), MAX(amount), MIN(CASE WHEN amount > 0 THEN amount END),
+                    MIN(date), MAX(date)
+                FROM transactions
+                GROUP BY 1, 2, 3, 4, 5, 6
+            ''')
+            conn.execute("INSERT OR REPLACE INTO dashboard_kpis (k, v) VALUES ('rollup_version', ?)", (version,))
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        conn.execute('ROLLBACK')
+        raise
@@ -3,6 +3,9 @@
 -- Drop existing table to recreate with new schema
 DROP TABLE IF EXISTS transactions;
 DROP TABLE IF EXISTS unprocessed_sms;
+DROP TABLE IF EXISTS dashboard_kpis;
+DROP TABLE IF EXISTS transaction_metrics;  -- Former Flask-only rollup
+DROP TABLE IF EXISTS transaction_rollup;
 
 -- Main transactions table with all required fields
 CREATE TABLE IF NOT EXISTS transactions (
@@ -19,7 +22,10 @@ CREATE TABLE IF NOT EXISTS transactions (
     description TEXT,                       -- Short description for UI
     raw_message TEXT,                       -- Original SMS content
     raw_body TEXT,                          -- For FastAPI compatibility (maps to raw_message)
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    month TEXT GENERATED ALWAYS AS (strftime('%Y-%m', date)) STORED,                     -- Derived date parts,
+    dow INTEGER GENERATED ALWAYS AS (CAST(strftime('%w', date) AS INTEGER)) STORED,      -- computed once on write
+    hour INTEGER GENERATED ALWAYS AS (CAST(strftime('%H', date) AS INTEGER)) STORED      -- for dashboard grouping
 );
 
 -- Table for logging unprocessed SMS messages
@@ -31,6 +37,40 @@ CREATE TABLE IF NOT EXISTS unprocessed_sms (
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Materialized dashboard insight KPIs (JSON values), recomputed by the
+-- Flask API on the first insights request after data_version changes
+CREATE TABLE IF NOT EXISTS dashboard_kpis (
+    k TEXT PRIMARY KEY,
+    v TEXT
+);
+INSERT OR IGNORE INTO dashboard_kpis (k, v) VALUES ('data_version', '0');
+
+-- Per (day, hour, type) rollup of transactions that the Flask analytics report
+-- and the FastAPI statistics, summary and analytics endpoints aggregate instead
+-- of the fact table (api/rollup.py), rebuilt when data_version moves past the
+-- rollup_version recorded in dashboard_kpis
+CREATE TABLE IF NOT EXISTS transaction_rollup (
+    day TEXT,
+    month TEXT,
+    dow INTEGER,
+    hour INTEGER,
+    type TEXT,
+    dated INTEGER,                          -- 1 when date is neither NULL nor ''
+    tx_count INTEGER,
+    amount_count INTEGER,                   -- Non-NULL amounts, the divisor for averages
+    total_volume REAL,
+    total_fees REAL,
+    completed_count INTEGER,
+    positive_count INTEGER,                 -- Amounts above zero and their sum
+    positive_volume REAL,
+    min_amount REAL,
+    max_amount REAL,
+    min_positive_amount REAL,
+    first_date TEXT,
+    last_date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_day ON transaction_rollup(day);
+
 -- Performance indexes
 CREATE INDEX IF NOT EXISTS idx_transaction_id ON transactions(transaction_id);
 CREATE INDEX IF NOT EXISTS idx_type ON transactions(type);
@@ -42,6 +82,16 @@ CREATE INDEX IF NOT EXISTS idx_recipient ON transactions(recipient);
 CREATE INDEX IF NOT EXISTS idx_receiver ON transactions(receiver);
 CREATE INDEX IF NOT EXISTS idx_created_at ON transactions(created_at);
 
+-- Composite indexes for dashboard aggregations (index-only GROUP BY / SUM)
+CREATE INDEX IF NOT EXISTS idx_type_amount ON transactions(type, amount);
+CREATE INDEX IF NOT EXISTS idx_date_type_amount ON transactions(date, type, amount);
+CREATE INDEX IF NOT EXISTS idx_month_type ON transactions(month, type);
+CREATE INDEX IF NOT EXISTS idx_hour ON transactions(hour);
+
+-- Lets the FastAPI upload's INSERT OR IGNORE skip SMS that are already stored
+CREATE UNIQUE INDEX IF NOT EXISTS idx_upload_unique
+ON transactions(IFNULL(transaction_id, ''), IFNULL(date, ''), raw_body);
+
 -- Triggers to keep compatible columns in sync
 CREATE TRIGGER IF NOT EXISTS sync_recipient_receiver_insert
 AFTER INSERT ON transactions
@@ -80,4 +130,23 @@ BEGIN
     UPDATE transactions 
     SET description = REPLACE(NEW.type, '_', ' ') || ' - ' || CAST(NEW.amount AS TEXT) || ' RWF'
     WHERE id = NEW.id;
-END;
\ No newline at end of file
+END;
+
+-- Triggers to bump the dashboard data_version whenever transactions change
+CREATE TRIGGER IF NOT EXISTS kpis_version_insert
+AFTER INSERT ON transactions
+BEGIN
+    UPDATE dashboard_kpis SET v = v + 1 WHERE k = 'data_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS kpis_version_update
+AFTER UPDATE ON transactions
+BEGIN
+    UPDATE dashboard_kpis SET v = v + 1 WHERE k = 'data_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS kpis_version_delete
+AFTER DELETE ON transactions
+BEGIN
+    UPDATE dashboard_kpis SET v = v + 1 WHERE k = 'data_version';
+END;
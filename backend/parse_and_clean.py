@@ -7,20 +7,27 @@ import os
 os.makedirs("logs", exist_ok=True)
 logging.basicConfig(filename="logs/unprocessed_sms.log", level=logging.INFO)
 
+# Patterns are compiled once here rather than looked up in re's cache per SMS
+_TXID_PATTERNS = (
+    re.compile(r"TxId[:\s]*([0-9]+)"),
+    re.compile(r"Transaction ID[:\s]*([0-9]+)"),
+    re.compile(r"Financial Transaction Id[:\s]*([0-9]+)"),
+)
+_DATE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+_RECEIVED_PATTERN = re.compile(r"received\s+(\d+)\s+RWF\s+from\s+(.*?)(?:\.|$)")
+_PAYMENT_PATTERN = re.compile(r"payment of (\d+) RWF to (.*?)(?:\.|$)")
+_WITHDRAWAL_PATTERN = re.compile(r"withdrawn\s+(\d+)\s+RWF.*?agent.*?:\s+(.*?)\s+\(")
+_BUNDLE_PATTERN = re.compile(r"bundle.*?for\s+(\d+)\s+RWF")
+
 def extract_transaction_id(body):
-    match = re.search(r"TxId[:\s]*([0-9]+)", body)
-    if match:
-        return match.group(1)
-    match = re.search(r"Transaction ID[:\s]*([0-9]+)", body)
-    if match:
-        return match.group(1)
-    match = re.search(r"Financial Transaction Id[:\s]*([0-9]+)", body)
-    if match:
-        return match.group(1)
+    for pattern in _TXID_PATTERNS:
+        match = pattern.search(body)
+        if match:
+            return match.group(1)
     return None
 
 def extract_date(body):
-    match = re.search(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})", body)
+    match = _DATE_PATTERN.search(body)
     if match:
         try:
             return datetime.strptime(match.group(1).strip(), "%Y-%m-%d %H:%M:%S").isoformat()
@@ -30,7 +37,7 @@ def extract_date(body):
 
 def parse_message(body):
     if "received" in body and "from" in body:
-        match = re.search(r"received\s+(\d+)\s+RWF\s+from\s+(.*?)(?:\.|$)", body)
+        match = _RECEIVED_PATTERN.search(body)
         if match:
             return {
                 "type": "Incoming Money",
@@ -43,7 +50,7 @@ def parse_message(body):
             }
 
     elif "payment of" in body and "to" in body:
-        match = re.search(r"payment of (\d+) RWF to (.*?)(?:\.|$)", body)
+        match = _PAYMENT_PATTERN.search(body)
         if match:
             return {
                 "type": "Payment",
@@ -56,7 +63,7 @@ def parse_message(body):
             }
 
     elif "withdrawn" in body and "agent" in body:
-        match = re.search(r"withdrawn\s+(\d+)\s+RWF.*?agent.*?:\s+(.*?)\s+\(", body)
+        match = _WITHDRAWAL_PATTERN.search(body)
         if match:
             return {
                 "type": "Agent Withdrawal",
@@ -69,7 +76,7 @@ def parse_message(body):
             }
 
     elif "internet bundle" in body:
-        match = re.search(r"bundle.*?for\s+(\d+)\s+RWF", body)
+        match = _BUNDLE_PATTERN.search(body)
         if match:
             return {
                 "type": "Internet Bundle Purchase",
@@ -84,11 +91,21 @@ def parse_message(body):
     return None
 
 def parse_sms(file_path):
-    tree = ET.parse(file_path)
-    root = tree.getroot()
     messages = []
 
-    for sms in root.findall("sms"):
+    # Parse incrementally, emptying the root as each <sms> ends instead of loading the whole file
+    depth = 0
+    for event, sms in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            if depth == 0:
+                root = sms
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1 or sms.tag != "sms":
+            continue
+        root.clear()
+
         body = sms.get("body")
         if body is None:
             continue
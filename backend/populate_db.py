@@ -1,20 +1,36 @@
+import os
 import sqlite3
-import xml.etree.ElementTree as ET
 import re
 import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
+
+try:
+    from lxml import etree as ET
+except ImportError:  # lxml is optional - its iterparse is faster, the stdlib one reads the same files
+    import xml.etree.ElementTree as ET
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Added to a transactions table created before they were part of the schema. ALTER TABLE can
+# only add VIRTUAL generated columns - a fresh table gets them STORED below
+DERIVED_COLUMNS = {
+    'month': "TEXT GENERATED ALWAYS AS (strftime('%Y-%m', date)) VIRTUAL",
+    'dow': "INTEGER GENERATED ALWAYS AS (CAST(strftime('%w', date) AS INTEGER)) VIRTUAL",
+    'hour': "INTEGER GENERATED ALWAYS AS (CAST(strftime('%H', date) AS INTEGER)) VIRTUAL",
+}
+
 def create_tables(conn):
     """Create tables with enhanced schema"""
     with conn:
         # Enhanced transactions table
         conn.execute("""
         CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER PRIMARY KEY,
             transaction_id TEXT,
             type TEXT,
             sender TEXT,
@@ -25,10 +41,21 @@ def create_tables(conn):
             status TEXT DEFAULT 'completed',
             description TEXT,
             raw_message TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            month TEXT GENERATED ALWAYS AS (strftime('%Y-%m', date)) STORED,
+            dow INTEGER GENERATED ALWAYS AS (CAST(strftime('%w', date) AS INTEGER)) STORED,
+            hour INTEGER GENERATED ALWAYS AS (CAST(strftime('%H', date) AS INTEGER)) STORED,
+            UNIQUE(transaction_id)
         )
         """)
         
+        # table_info hides generated columns, table_xinfo lists them
+        columns = {row[1] for row in conn.execute('PRAGMA table_xinfo(transactions)')}
+        for name, definition in DERIVED_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f'ALTER TABLE transactions ADD COLUMN {name} {definition}')
+                logger.info(f"Added {name} column to transactions table")
+        
         # Unprocessed SMS table
         conn.execute("""
         CREATE TABLE IF NOT EXISTS unprocessed_sms (
@@ -38,84 +65,83 @@ def create_tables(conn):
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         """)
-        
-        # Create indexes
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_transaction_id ON transactions(transaction_id)")
+
+def create_indexes(conn):
+    """Create the query indexes and refresh planner statistics"""
+    # Run after the bulk insert - building each index once from the loaded rows is cheaper
+    # than updating all seven of them row by row. transaction_id lookups use the UNIQUE
+    # constraint's index, which has to be kept up during the insert for OR IGNORE anyway
+    with conn:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_type ON transactions(type)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_date ON transactions(date)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_amount ON transactions(amount)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_type_amount ON transactions(type, amount)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_date_type_amount ON transactions(date, type, amount)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_month_type ON transactions(month, type)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_hour ON transactions(hour)")
+        
+        # So the report indexes get used after a bulk load
+        conn.execute('ANALYZE transactions')
+
+# Module level, so parse_sms_enhanced reuses these for every SMS in the export
+_TXID_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'TxId[:\s]*([0-9]+)',
+    r'Financial Transaction Id[:\s]*([0-9]+)',
+    r'Transaction ID[:\s]*([0-9]+)',
+    r'External Transaction Id[:\s]*([A-Z0-9]+)'
+))
+# Any "received/payment of/transaction of N RWF" or "at/completed at <date>" text also matches
+# the bare pattern, which is tried first - so the longer forms could never change the result
+_AMOUNT_PATTERN = re.compile(r'(\d{1,10}(?:,\d{3})*(?:\.\d{2})?)\s*RWF', re.IGNORECASE)
+_DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+_FEE_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'Fee[:\s]*(\d+(?:\.\d{2})?)\s*RWF',
+    r'fee was\s+(\d+(?:\.\d{2})?)\s*RWF',
+    r'Charge[:\s]*(\d+(?:\.\d{2})?)\s*RWF'
+))
+_SENDER_PATTERN = re.compile(r'from\s+([^(]+?)(?:\s*\([^)]*\))?\s+on your mobile', re.IGNORECASE)
+_PAYEE_PATTERN = re.compile(r'payment of.*?to\s+([^0-9]+?)(?:\s+\d+)?\s+has been', re.IGNORECASE)
+_AGENT_PATTERN = re.compile(r'agent.*?:\s*([^.]+)', re.IGNORECASE)
 
 def extract_transaction_id(body):
     """Extract transaction ID from SMS body"""
-    patterns = [
-        r'TxId[:\s]*([0-9]+)',
-        r'Financial Transaction Id[:\s]*([0-9]+)',
-        r'Transaction ID[:\s]*([0-9]+)',
-        r'External Transaction Id[:\s]*([A-Z0-9]+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, body, re.IGNORECASE)
+    for pattern in _TXID_PATTERNS:
+        match = pattern.search(body)
         if match:
             return match.group(1)
     return None
 
 def extract_amount(body):
     """Extract amount from SMS body"""
-    patterns = [
-        r'(\d{1,10}(?:,\d{3})*(?:\.\d{2})?)\s*RWF',
-        r'received\s+(\d{1,10}(?:,\d{3})*)\s*RWF',
-        r'payment of\s+(\d{1,10}(?:,\d{3})*)\s*RWF',
-        r'transaction of\s+(\d{1,10}(?:,\d{3})*)\s*RWF'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, body, re.IGNORECASE)
-        if match:
-            amount_str = match.group(1).replace(',', '')
-            try:
-                return float(amount_str)
-            except ValueError:
-                continue
+    match = _AMOUNT_PATTERN.search(body)
+    if match:
+        # The pattern only matches digits with an optional .NN, so float() can't fail
+        return float(match.group(1).replace(',', ''))
     return None
 
 def extract_fee(body):
     """Extract fee from SMS message"""
-    patterns = [
-        r'Fee[:\s]*(\d+(?:\.\d{2})?)\s*RWF',
-        r'fee was\s+(\d+(?:\.\d{2})?)\s*RWF',
-        r'Charge[:\s]*(\d+(?:\.\d{2})?)\s*RWF'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, body, re.IGNORECASE)
+    for pattern in _FEE_PATTERNS:
+        match = pattern.search(body)
         if match:
-            try:
-                return float(match.group(1))
-            except ValueError:
-                continue
+            return float(match.group(1))
     return 0
 
 def extract_date(body):
     """Extract date from SMS body"""
-    patterns = [
-        r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})',
-        r'at (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})',
-        r'completed at (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, body)
-        if match:
-            try:
-                return datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S').isoformat()
-            except ValueError:
-                return match.group(1)
+    match = _DATE_PATTERN.search(body)
+    if match:
+        try:
+            # The pattern only matches 'YYYY-MM-DD HH:MM:SS', which fromisoformat parses in C
+            return datetime.fromisoformat(match.group(1)).isoformat()
+        except ValueError:
+            return match.group(1)
     return None
 
-def categorize_transaction(body):
+def categorize_transaction(body, body_lower=None):
     """Categorize transaction type based on SMS content"""
-    body_lower = body.lower()
+    if body_lower is None:
+        body_lower = body.lower()
     
     if "received" in body_lower and "from" in body_lower:
         return "INCOMING_MONEY"
@@ -141,19 +167,19 @@ def extract_sender_receiver(body, transaction_type):
     
     if transaction_type == "INCOMING_MONEY":
         # Extract sender from "received X RWF from SENDER"
-        match = re.search(r'from\s+([^(]+?)(?:\s*\([^)]*\))?\s+on your mobile', body, re.IGNORECASE)
+        match = _SENDER_PATTERN.search(body)
         if match:
             sender = match.group(1).strip()
     
     elif transaction_type == "PAYMENT":
         # Extract receiver from "payment of X RWF to RECEIVER"
-        match = re.search(r'payment of.*?to\s+([^0-9]+?)(?:\s+\d+)?\s+has been', body, re.IGNORECASE)
+        match = _PAYEE_PATTERN.search(body)
         if match:
             receiver = match.group(1).strip()
     
     elif transaction_type == "WITHDRAWAL":
         # Extract agent info
-        match = re.search(r'agent.*?:\s*([^.]+)', body, re.IGNORECASE)
+        match = _AGENT_PATTERN.search(body)
         if match:
             receiver = match.group(1).strip()
     
@@ -165,115 +191,198 @@ def create_description(body):
         return body[:97] + "..."
     return body
 
-def extract_status(body):
+def extract_status(body, body_lower=None):
     """Extract transaction status from SMS"""
-    body_lower = body.lower()
+    if body_lower is None:
+        body_lower = body.lower()
     
-    if any(word in body_lower for word in ['completed', 'successful', 'confirmed']):
+    # Spelled out rather than any() over a generator, which costs a frame per SMS
+    if 'completed' in body_lower or 'successful' in body_lower or 'confirmed' in body_lower:
         return 'completed'
-    elif any(word in body_lower for word in ['failed', 'declined', 'error']):
+    elif 'failed' in body_lower or 'declined' in body_lower or 'error' in body_lower:
         return 'failed'
     else:
         return 'completed'  # Default
 
+# OR IGNORE skips SMS whose transaction ID is already stored, so rerunning the import on the same
+# export adds nothing twice. SMS without an ID have a NULL transaction_id and are always inserted
+INSERT_TRANSACTION_SQL = """
+    INSERT OR IGNORE INTO transactions (
+        type, amount, sender, recipient, transaction_id, date, 
+        fee, status, description, raw_message
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 def parse_sms_enhanced(body):
-    """Enhanced SMS parsing"""
-    transaction = {}
-    
-    # Basic extraction
-    transaction["type"] = categorize_transaction(body)
-    transaction["amount"] = extract_amount(body)
-    transaction["transaction_id"] = extract_transaction_id(body)
-    transaction["date"] = extract_date(body)
-    transaction["fee"] = extract_fee(body)
-    transaction["status"] = extract_status(body)
-    transaction["description"] = create_description(body)
-    transaction["raw_message"] = body
-    
-    # Extract sender/receiver
-    sender, receiver = extract_sender_receiver(body, transaction["type"])
-    transaction["sender"] = sender
-    transaction["recipient"] = receiver
+    """Enhanced SMS parsing; returns the INSERT_TRANSACTION_SQL parameters for the SMS"""
+    body_lower = body.lower()  # shared by the keyword checks below
+    transaction_type = categorize_transaction(body, body_lower)
+    sender, receiver = extract_sender_receiver(body, transaction_type)
     
-    return transaction
+    # A tuple in the INSERT column order goes straight to executemany without a dict in between
+    return (
+        transaction_type,
+        extract_amount(body),
+        sender,
+        receiver,
+        extract_transaction_id(body),
+        extract_date(body),
+        extract_fee(body),
+        extract_status(body, body_lower),
+        create_description(body),
+        body
+    )
 
-def insert_transaction(conn, tx):
-    """Insert transaction with enhanced fields"""
+def insert_transaction(conn, row):
+    """Insert transaction with enhanced fields; returns 1, 0 if it was already stored, or None on error"""
     try:
         with conn:
-            conn.execute("""
-                INSERT INTO transactions (
-                    type, amount, sender, recipient, transaction_id, date, 
-                    fee, status, description, raw_message
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                tx.get("type"),
-                tx.get("amount"),
-                tx.get("sender"),
-                tx.get("recipient"),
-                tx.get("transaction_id"),
-                tx.get("date"),
-                tx.get("fee", 0),
-                tx.get("status", 'completed'),
-                tx.get("description"),
-                tx.get("raw_message")
-            ))
-            return True
+            return conn.execute(INSERT_TRANSACTION_SQL, row).rowcount
     except Exception as e:
         logger.error(f"Error inserting transaction: {e}")
-        return False
+        return None
 
-def log_unprocessed_sms(conn, message, reason):
-    """Log SMS that couldn't be processed"""
+def insert_transactions(conn, file_path, unprocessed):
+    """Parse and insert the file's transactions in one database transaction; returns (inserted, already stored)"""
+    valid = 0
+    
+    def counted(rows):
+        nonlocal valid
+        for row in rows:
+            valid += 1
+            yield row
+    
+    try:
+        with conn:
+            # executemany pulls rows from the parser as it goes, so they are never all held at once
+            inserted = conn.executemany(INSERT_TRANSACTION_SQL, counted(iter_transaction_rows(file_path, unprocessed))).rowcount
+        return inserted, valid - inserted
+    except sqlite3.Error as e:
+        # Nothing was committed - parse again and insert row by row so only the bad rows are lost
+        logger.error(f"Error bulk inserting transactions, retrying one at a time: {e}")
+        unprocessed.clear()
+        failed = []
+        inserted = skipped = 0
+        for row in iter_transaction_rows(file_path, unprocessed):
+            added = insert_transaction(conn, row)
+            if added is None:
+                failed.append((row[-1], "Database insertion failed"))
+            elif added:
+                inserted += 1
+            else:
+                skipped += 1
+        unprocessed.extend(failed)
+        return inserted, skipped
+
+def log_unprocessed_sms(conn, rows):
+    """Log (message, reason) rows for SMS that couldn't be processed"""
     try:
         with conn:
-            conn.execute("""
+            conn.executemany("""
                 INSERT INTO unprocessed_sms (raw_message, reason)
                 VALUES (?, ?)
-            """, (message, reason))
+            """, rows)
+        for message, reason in rows:
             logger.warning(f"Unprocessed SMS: {reason}")
     except Exception as e:
         logger.error(f"Error logging unprocessed SMS: {e}")
 
+# The regex parsing is CPU-bound, so on multi-core machines batches of SMS parse in worker
+# processes while this one reads the XML and does the (single-writer) inserts
+PARSE_BATCH_SIZE = 5000
+PARSE_WORKERS = os.cpu_count() or 1
+
+def iter_mmoney_bodies(file_path):
+    """Yield the bodies of the M-Money SMS in the XML file"""
+    # root.clear() drops each <sms> after its body is read, so memory stays flat on large exports
+    depth = 0
+    for event, sms in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            if depth == 0:
+                root = sms
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1 or sms.tag != "sms":
+            continue
+        root.clear()
+        
+        # Only process M-Money SMS - checked first so other senders' bodies are never fetched
+        address = sms.get('address', '')
+        if 'M-Money' not in address:
+            continue
+        
+        body = sms.get('body')
+        if not body:
+            continue
+        
+        yield body
+
+def parse_sms_batch(bodies):
+    """Parse SMS bodies into (row, None) or (None, (body, reason)) pairs, in order"""
+    results = []
+    for body in bodies:
+        # Without an RWF amount the SMS can only fail validation - skip the regex passes
+        if 'RWF' not in body and 'rwf' not in body.lower():
+            results.append((None, (body, "Missing required fields (amount or type)")))
+            continue
+        
+        try:
+            transaction = parse_sms_enhanced(body)
+        except Exception as e:
+            results.append((None, (body, f"Parsing error: {str(e)}")))
+            continue
+        
+        # Validate required fields (amount and type)
+        if transaction[1] and transaction[0]:
+            results.append((transaction, None))
+        else:
+            results.append((None, (body, "Missing required fields (amount or type)")))
+    return results
+
+def map_in_pool(func, batches, workers):
+    """Like map(), but in worker processes with at most two batches per worker in flight"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(func, batch))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def iter_transaction_rows(file_path, unprocessed):
+    """Yield INSERT_TRANSACTION_SQL rows for the M-Money SMS in the XML file"""
+    bodies = iter_mmoney_bodies(file_path)
+    batches = iter(lambda: list(islice(bodies, PARSE_BATCH_SIZE)), [])
+    if PARSE_WORKERS > 1:
+        results = map_in_pool(parse_sms_batch, batches, PARSE_WORKERS)
+    else:
+        # A pool only adds pickling overhead with a single core
+        results = map(parse_sms_batch, batches)
+    
+    for batch in results:
+        for row, rejected in batch:
+            if row is None:
+                unprocessed.append(rejected)
+            else:
+                yield row
+
 def process_xml_file(file_path, conn):
     """Process the SMS XML file"""
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        
-        processed_count = 0
-        unprocessed_count = 0
+        # Rejected SMS are collected here and written in one commit after the transactions
+        unprocessed = []
+        processed_count, skipped_count = insert_transactions(conn, file_path, unprocessed)
+        if unprocessed:
+            log_unprocessed_sms(conn, unprocessed)
         
-        for sms in root.findall('sms'):
-            body = sms.get('body')
-            if not body:
-                continue
-            
-            # Only process M-Money SMS
-            address = sms.get('address', '')
-            if 'M-Money' not in address:
-                continue
-            
-            try:
-                transaction = parse_sms_enhanced(body)
-                
-                # Validate required fields
-                if transaction.get('amount') and transaction.get('type'):
-                    if insert_transaction(conn, transaction):
-                        processed_count += 1
-                    else:
-                        log_unprocessed_sms(conn, body, "Database insertion failed")
-                        unprocessed_count += 1
-                else:
-                    log_unprocessed_sms(conn, body, "Missing required fields (amount or type)")
-                    unprocessed_count += 1
-                    
-            except Exception as e:
-                log_unprocessed_sms(conn, body, f"Parsing error: {str(e)}")
-                unprocessed_count += 1
+        unprocessed_count = len(unprocessed)
         
-        logger.info(f"Processed: {processed_count}, Unprocessed: {unprocessed_count}")
+        logger.info(f"Processed: {processed_count}, Unprocessed: {unprocessed_count}, Already stored: {skipped_count}")
+        if skipped_count:
+            logger.warning(f"Skipped {skipped_count} SMS whose transaction ID is already in the database")
         return processed_count, unprocessed_count
         
     except Exception as e:
@@ -284,6 +393,13 @@ def main():
     """Main processing function"""
     # Use momo.db to match your view_data.py
     conn = sqlite3.connect('momo.db')
+    # Same WAL mode the APIs open the database in. NORMAL only syncs at checkpoints, so a crash
+    # can lose the last commits of a reload - rerunning the script rebuilds them from the XML
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-65536')  # 64MB, keeps the index pages hot during the bulk insert
+    conn.execute('PRAGMA mmap_size=268435456')
     
     try:
         # Create enhanced tables
@@ -293,6 +409,7 @@ def main():
         # Process XML file
         xml_file_path = '../sms_data.xml'
         processed, unprocessed = process_xml_file(xml_file_path, conn)
+        create_indexes(conn)
         
         # Get final count
         cursor = conn.cursor()